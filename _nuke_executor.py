@@ -18,14 +18,20 @@ Outputs results and dependency information as JSON to stdout.
 
 import nuke
 import os
+import posixpath
 import sys
 import json
 import traceback
 import argparse
+import bisect
+import concurrent.futures
+import functools
+from collections import deque
 from pathlib import Path # Use pathlib for path manipulation within Nuke
-from typing import Dict, List, Set, Optional, Tuple, Any, Union # Use standard typing
+from typing import Dict, List, Set, Optional, Tuple, Any, Union, Deque # Use standard typing
 import logging
 import re # Added for regex matching
+import stat
 
 # Configure logging based on NUKE_VERBOSITY environment variable
 # This ensures the executor script respects the verbosity level set by the parent process
@@ -50,14 +56,23 @@ logging.basicConfig(level=log_level,
                     format=log_format,
                     stream=sys.stderr)
 log = logging.getLogger(__name__)
+_DEBUG_ENABLED: bool = log.isEnabledFor(logging.DEBUG) # Gate for costly debug-only work (e.g. traceback formatting)
 log.debug(f"Nuke executor logging initialized at level: {logging.getLevelName(log_level)} (NUKE_VERBOSITY={verbosity_level})")
 
-def _log_print(level: str, message: str) -> None:
-    """Simple print-based logging mimic for Nuke environment, now targets stderr."""
+def _log_print(level: str, message: str, *args: Any) -> None:
+    """
+    Simple print-based logging mimic for Nuke environment, now targets stderr.
+    As with logging, args are %-formatted into message only if the line is actually written,
+    so per-node debug calls can pass values instead of building f-strings.
+    """
     # Output format matches basic logger for parsing by main process if needed
     # Using a direct print to sys.stderr for robustness in Nuke -t environment.
+    if level == "debug" and not _DEBUG_ENABLED:
+        return # Respect NUKE_VERBOSITY: debug lines are only written when the parent runs at DEBUG
     try:
         # Basic sanitization for the message to avoid print errors with special chars.
+        if args:
+            message = message % args
         safe_message = str(message).replace('\n', '\\n') # Escape newlines for single-line log output
         print(f"[{level.upper():<7}] [NukeExecutor_LogPrintDirect] {safe_message}", file=sys.stderr)
         sys.stderr.flush() # Ensure it gets written out immediately
@@ -157,6 +172,20 @@ READ_NODE_CLASSES: frozenset[str] = frozenset([
 WRITE_NODE_CLASSES: frozenset[str] = frozenset(["Write", "WriteGeo", "DeepWrite"])
 # --- End Mirrored Constants ---
 
+# File knobs to inspect per node class, looked up once per node instead of re-deriving per node
+READ_CLASS_FILE_KNOBS: Dict[str, Tuple[str, ...]] = {cls: ("file", "proxy") for cls in READ_NODE_CLASSES}
+READ_CLASS_FILE_KNOBS["OCIOFileTransform"] = ("file", "proxy", "cccid")
+READ_CLASS_FILE_KNOBS["Vectorfield"] = ("file", "proxy", "vfield_file")
+# Knobs considered for repathing: read knobs above plus file/proxy on Write classes
+REPATH_CLASS_FILE_KNOBS: Dict[str, Tuple[str, ...]] = {
+    **{cls: ("file", "proxy") for cls in WRITE_NODE_CLASSES},
+    **READ_CLASS_FILE_KNOBS,
+}
+
+# Elements rule: strip 'Comp/work/<version>/images/' from shot-relative paths
+COMP_WORK_IMAGES_PREFIX: str = "comp/work/" # Lower-case literal prefix the regex below is anchored on
+COMP_WORK_IMAGES_RE = re.compile(r"Comp/work/[^/]+/images/(.*)", re.IGNORECASE)
+
 
 # --- SPT Directory Format Constants (mirroring fixarc.constants) ---
 # VENDOR_DIR = "{vendor}" # Now defined above
@@ -167,16 +196,86 @@ WRITE_NODE_CLASSES: frozenset[str] = frozenset(["Write", "WriteGeo", "DeepWrite"
 
 # --- Helper Functions (Internal to this script) ---
 
-def _is_valid_writefix(node: nuke.Node) -> bool:
-    """Check if a Group node is a WriteFix gizmo excluding 'QuickReview'."""
-    if node.Class() != 'Group': return False
-    if not node.knob('writefix'): return False # Check for identifying knob
-    profile_knob = node.knob('profile')
-    if profile_knob and profile_knob.value() == 'QuickReview':
-        _log_print("debug", f"Ignoring WriteFix '{node.fullName()}' (QuickReview profile)")
+_ensured_dirs: Set[str] = set() # Directories already created/confirmed during this Nuke session
+
+def _ensure_dir(dir_path: str) -> None:
+    """Creates dir_path (and parents) once per process; repeat calls for the same path are free."""
+    if dir_path in _ensured_dirs:
+        return
+    os.makedirs(dir_path, exist_ok=True)
+    _ensured_dirs.add(dir_path)
+
+def _is_valid_writefix(node: nuke.Node, node_class: Optional[str] = None) -> bool:
+    """
+    Check if a Group node is a WriteFix gizmo excluding 'QuickReview'.
+    Pass node_class when the caller already has it to save a Class() call.
+    """
+    if (node_class or node.Class()) != 'Group': return False
+    if node.knob('writefix') is None: return False # Check for identifying knob
+    profile_knob = node.knob('profile') # Only looked up for actual WriteFix groups
+    if profile_knob is not None and profile_knob.value() == 'QuickReview':
+        _log_print("debug", "Ignoring WriteFix '%s' (QuickReview profile)", _full_name(node))
         return False
     return True
 
+# fullName() walks the parent chain and nuke.toNode() is a script-wide lookup; both are repeated for
+# the same nodes by tracing, backdrop matching, collection, repathing and saving. Entries hold the
+# node object itself so its id() cannot be reused while cached.
+_full_name_cache: Dict[int, Tuple[nuke.Node, str]] = {}
+_node_by_name_cache: Dict[str, nuke.Node] = {}
+_node_class_cache: Dict[int, Tuple[nuke.Node, str]] = {}
+
+def _full_name(node: nuke.Node) -> str:
+    """Returns node.fullName(), memoized per node object."""
+    cached = _full_name_cache.get(id(node))
+    if cached is not None:
+        return cached[1]
+    name = node.fullName()
+    _full_name_cache[id(node)] = (node, name)
+    _node_by_name_cache.setdefault(name, node)
+    return name
+
+def _to_node(name: str) -> Optional[nuke.Node]:
+    """Returns the node for a full name, preferring nodes already seen via _full_name over nuke.toNode."""
+    node = _node_by_name_cache.get(name)
+    if node is None:
+        node = nuke.toNode(name)
+        if node is not None:
+            _node_by_name_cache[name] = node
+    return node
+
+def _node_class(node: nuke.Node) -> str:
+    """Returns node.Class(), memoized per node object (collection and repathing both need it)."""
+    cached = _node_class_cache.get(id(node))
+    if cached is not None:
+        return cached[1]
+    node_class = node.Class()
+    _node_class_cache[id(node)] = (node, node_class)
+    return node_class
+
+def _forget_node(node: nuke.Node, name: str) -> None:
+    """Drops cached name/class/lookup entries for a node that has been replaced or deleted."""
+    _full_name_cache.pop(id(node), None)
+    _node_class_cache.pop(id(node), None)
+    if _node_by_name_cache.get(name) is node:
+        del _node_by_name_cache[name]
+
+_write_output_cache: Dict[str, bool] = {} # Node full name -> is Write-class or valid WriteFix
+
+def _is_write_output(node: nuke.Node) -> bool:
+    """
+    Check if a node is a Write-class node or a valid WriteFix gizmo.
+    The cheap class-set test runs first; results are cached per node name since the
+    same root nodes are classified by several steps before any baking or saving.
+    """
+    node_name = _full_name(node)
+    is_write = _write_output_cache.get(node_name)
+    if is_write is None:
+        node_class = _node_class(node) # One Class() call covers both the Write and the WriteFix test
+        is_write = node_class in WRITE_NODE_CLASSES or _is_valid_writefix(node, node_class)
+        _write_output_cache[node_name] = is_write
+    return is_write
+
 # --- Action: Get Write Nodes (Copied and adapted from nuke_ops.py) ---
 def get_write_nodes_action() -> Dict[str, List[str]]:
     """
@@ -184,27 +283,24 @@ def get_write_nodes_action() -> Dict[str, List[str]]:
     Does not recurse into groups to find nested write nodes.
     """
     writes = []
-    # Only search root level nodes (no recurseGroups)
-    nodes = nuke.allNodes()
-    _log_print("info", f"Checking {len(nodes)} root level nodes for target writes...")
+    # Only search root level nodes (no recurseGroups). allNodes(filter) does the class test
+    # inside Nuke, so only Write-class nodes and Groups (WriteFix candidates) reach Python.
+    candidates: List[nuke.Node] = []
+    for write_class in sorted(WRITE_NODE_CLASSES):
+        candidates.extend(nuke.allNodes(write_class))
+    candidates.extend(n for n in nuke.allNodes('Group') if _is_valid_writefix(n, 'Group'))
+    _log_print("info", f"Checking {len(candidates)} root level write candidates for target writes...")
     count = 0
-    for node in nodes:
-        is_write = False
-        node_class = node.Class()
-        if node_class in WRITE_NODE_CLASSES:
-             is_write = True
-        elif _is_valid_writefix(node):
-             is_write = True
-
-        if is_write:
-            # Check if the write node is disabled
-            disable_knob = node.knob('disable')
-            if disable_knob and disable_knob.value():
-                 _log_print("debug", f"Ignoring disabled write node: {node.fullName()}")
-                 continue
-            _log_print("debug", f"Found valid write node: {node.fullName()} (Class: {node_class})")
-            writes.append(node.fullName())
-            count += 1
+    for node in candidates:
+        # Check if the write node is disabled
+        disable_knob = node.knob('disable')
+        if disable_knob and disable_knob.value():
+             _log_print("debug", "Ignoring disabled write node: %s", _full_name(node))
+             continue
+        if _DEBUG_ENABLED: # Class() is an API call; only make it when the line is written
+            _log_print("debug", "Found valid write node: %s (Class: %s)", _full_name(node), _node_class(node))
+        writes.append(_full_name(node))
+        count += 1
     _log_print("info", f"Found {count} valid root level write nodes.")
     return {"write_nodes": writes}
 
@@ -212,24 +308,21 @@ def get_write_nodes_action() -> Dict[str, List[str]]:
 def _get_upstream_nodes(target_nodes: List[nuke.Node]) -> Set[nuke.Node]:
     """Traces all upstream dependencies for a list of target nodes."""
     all_deps_set: Set[nuke.Node] = set(target_nodes) # Start with targets
-    nodes_to_process: List[nuke.Node] = list(target_nodes)
-    processed_nodes: Set[str] = set(n.fullName() for n in target_nodes) # Track by name
+    nodes_to_process: Deque[nuke.Node] = deque(target_nodes) # BFS queue; popleft() is O(1)
+    processed_nodes: Set[str] = set(_full_name(n) for n in target_nodes) # Track by name; each node is queued once
 
-    MAX_DEPTH = 5000 # Safety break
-    count = 0
+    # Combine input types for broader dependency check
+    input_types = nuke.INPUTS | nuke.HIDDEN_INPUTS | nuke.EXPRESSIONS
 
-    while nodes_to_process and count < MAX_DEPTH:
-        count += 1
-        current_node = nodes_to_process.pop(0)
+    while nodes_to_process:
+        current_node = nodes_to_process.popleft()
 
         try:
-            # Combine input types for broader dependency check
-            input_types = nuke.INPUTS | nuke.HIDDEN_INPUTS | nuke.EXPRESSIONS
             dependencies = current_node.dependencies(input_types)
 
             for dep_node in dependencies:
                 if not dep_node: continue
-                dep_name = dep_node.fullName()
+                dep_name = _full_name(dep_node)
                 if dep_name not in processed_nodes:
                     processed_nodes.add(dep_name)
                     all_deps_set.add(dep_node)
@@ -238,9 +331,6 @@ def _get_upstream_nodes(target_nodes: List[nuke.Node]) -> Set[nuke.Node]:
              _log_print("warning", f"Error getting dependencies for '{current_node.fullName()}': {e}")
              # Continue processing other nodes
 
-    if count >= MAX_DEPTH:
-        _log_print("warning", f"Dependency trace reached max depth ({MAX_DEPTH}). Results may be incomplete.")
-
     _log_print("info", f"Dependency trace found {len(all_deps_set)} upstream nodes (including targets).")
     return all_deps_set
 
@@ -250,34 +340,48 @@ def _find_associated_backdrops(nodes_to_check: Set[nuke.Node]) -> Set[nuke.Node]
 
     all_bd_nodes = nuke.allNodes('BackdropNode', recurseGroups=True)
     containing_backdrops: Set[nuke.Node] = set()
-    _log_print("debug", f"Checking {len(all_bd_nodes)} backdrops for association...")
-
-    # Pre-calculate node geometries
-    node_geoms: Dict[str, Tuple[float, float, float, float]] = {}
+    if not all_bd_nodes:
+        # No backdrops: skip reading the geometry of every required node
+        _log_print("info", "Script has no backdrops; nothing to associate.")
+        return containing_backdrops
+    _log_print("debug", "Checking %d backdrops for association...", len(all_bd_nodes))
+
+    # Pre-calculate node centers, sorted by x so each backdrop only tests nodes within its x-range
+    node_centers: List[Tuple[float, float]] = []
     for node in nodes_to_check:
         try:
              # Screen width/height can be 0 right after creation/load? Use defaults.
              nx, ny = node.xpos(), node.ypos()
              nw = node.screenWidth() or 80.0
              nh = node.screenHeight() or 18.0
-             node_geoms[node.fullName()] = (nx, ny, nw, nh)
+             node_centers.append((nx + nw / 2.0, ny + nh / 2.0))
         except ValueError:
              _log_print("warning", f"Could not get geometry for node '{node.fullName()}'")
+    node_centers.sort()
+    center_xs = [cx for cx, _ in node_centers]
+    center_ys = [cy for _, cy in node_centers]
+    if not node_centers: return containing_backdrops
+
+    # Bounding box of all centers: backdrops outside it cannot contain any node
+    min_x, max_x = center_xs[0], center_xs[-1]
+    min_y, max_y = min(center_ys), max(center_ys)
 
     for bd in all_bd_nodes:
         try:
             bx, by = bd.xpos(), bd.ypos()
+            if bx > max_x or by > max_y: continue # Rejected before reading the size knobs
             bw = bd['bdwidth'].value()
             bh = bd['bdheight'].value()
             bl, br, bt, bb = bx, bx + bw, by, by + bh
-
-            # Check if any target node's center is within this backdrop
-            for node_name, (nx, ny, nw, nh) in node_geoms.items():
-                 node_center_x = nx + nw / 2.0
-                 node_center_y = ny + nh / 2.0
-                 if bl <= node_center_x < br and bt <= node_center_y < bb:
+            if br <= min_x or bb <= min_y: continue
+
+            # Check if any target node's center is within this backdrop: bisect to the
+            # nodes with bl <= center_x < br, then test only their y.
+            start_idx = bisect.bisect_left(center_xs, bl)
+            end_idx = bisect.bisect_left(center_xs, br, start_idx)
+            for idx in range(start_idx, end_idx):
+                 if bt <= center_ys[idx] < bb:
                      containing_backdrops.add(bd)
-                     # _log_print("debug", f"Node '{node_name}' found inside backdrop '{bd.fullName()}'") # Verbose
                      break # Found one node inside, add backdrop and check next backdrop
         except (ValueError, TypeError):
              _log_print("warning", f"Could not get geometry for backdrop '{bd.fullName()}'.")
@@ -286,14 +390,42 @@ def _find_associated_backdrops(nodes_to_check: Set[nuke.Node]) -> Set[nuke.Node]
     _log_print("info", f"Found {len(containing_backdrops)} associated backdrops.")
     return containing_backdrops
 
+_STAT_POOL_MIN_PATHS = 16 # Below this, thread startup costs more than it saves
+_STAT_POOL_MAX_WORKERS = 16
+
+def _stat_path(path: str) -> Tuple[bool, bool]:
+    """Returns (exists, is_dir) for a path from a single stat call."""
+    try:
+        return True, stat.S_ISDIR(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        return False, False
+
+def _stat_paths(paths: Set[str]) -> Dict[str, Tuple[bool, bool]]:
+    """
+    Stats each unique path once, returning {path: (exists, is_dir)}.
+    os.stat releases the GIL, so on network storage a thread pool overlaps the round trips;
+    no Nuke API is touched, which keeps this safe off the main thread.
+    """
+    if len(paths) < _STAT_POOL_MIN_PATHS:
+        return {path: _stat_path(path) for path in paths}
+    ordered_paths = list(paths)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(_STAT_POOL_MAX_WORKERS, len(ordered_paths))) as pool:
+        return dict(zip(ordered_paths, pool.map(_stat_path, ordered_paths)))
+
 def _collect_dependency_paths(
     nodes: Set[nuke.Node],
     metadata_dict: Optional[Dict[str, Any]],
-    library_roots_config: List[str]
+    library_roots_config: List[str],
+    knob_resolutions: Optional[Dict[str, Tuple[nuke.Node, nuke.Knob, Any, Any, Optional[str]]]] = None
 ) -> Dict[str, Dict[str, Any]]:
     """
     Iterates through nodes and collects file paths from relevant knobs.
     Determines category, source item on disk, and other characteristics for each dependency.
+    If knob_resolutions is given, it is filled with
+    {"NodeName.knobName": (node, knob, knob value, evaluated value or None if empty, lookup path)}
+    for every knob scanned, so _repath_nodes can reuse the knob objects and evaluations instead of
+    looking them up and evaluating them again. The lookup path is the absolute, forward-slash form
+    of the evaluated value when collection already computed it (None otherwise).
     Returns:
     {
         "NodeName.knobName": {
@@ -308,8 +440,9 @@ def _collect_dependency_paths(
         }, ...
     }
     """
+    _log = _log_print # Local alias avoids a global lookup per log call in the per-knob loop
     dependency_details: Dict[str, Dict[str, Any]] = {}
-    _log_print("info", f"Collecting dependency paths from {len(nodes)} nodes...")
+    _log("info", f"Collecting dependency paths from {len(nodes)} nodes...")
     script_dir = None
     current_script_name = "Root"
 
@@ -319,9 +452,9 @@ def _collect_dependency_paths(
             if current_script_name and current_script_name != "Root":
                 script_dir = os.path.dirname(current_script_name)
             else:
-                _log_print("warning", "Script has no name or is 'Root'. Relative paths may not resolve correctly initially.")
+                _log("warning", "Script has no name or is 'Root'. Relative paths may not resolve correctly initially.")
         except RuntimeError as e:
-            _log_print("warning", f"Could not get script name for resolving relative paths: {e}")
+            _log("warning", f"Could not get script name for resolving relative paths: {e}")
 
     project_specific_asset_roots: List[str] = []
     if metadata_dict and metadata_dict.get('show'):
@@ -332,26 +465,38 @@ def _collect_dependency_paths(
                 prefix_path = Path(prefix_str.replace("\\", "/")) # Corrected: single backslash
                 proj_assets_path = prefix_path / project_name / "assets"
                 project_specific_asset_roots.append(str(proj_assets_path).replace("\\", "/") + "/") # Corrected: single backslash
-                _log_print("debug", f"Derived project-specific asset root: {str(proj_assets_path)}/")
+                _log("debug", "Derived project-specific asset root: %s/", str(proj_assets_path))
         except Exception as e:
-            _log_print("warning", f"Could not construct project-specific asset root paths for project '{project_name}': {e}")
+            _log("warning", f"Could not construct project-specific asset root paths for project '{project_name}': {e}")
 
     all_library_roots = [Path(p.replace("\\", "/")) for p in library_roots_config] + \
                         [Path(p.replace("\\", "/")) for p in project_specific_asset_roots] # Corrected: single backslash for elements of project_specific_asset_roots
-    _log_print("debug", f"Effective library/asset roots for categorization: {all_library_roots}")
+    _log("debug", "Effective library/asset roots for categorization: %s", all_library_roots)
+    # Loop-invariant: (root as reported, lower-cased "root/" prefix) so each knob only lower-cases its own path
+    library_root_prefixes: List[Tuple[str, str]] = [
+        (str(lib_root), str(lib_root).replace("\\", "/").rstrip("/").lower() + "/") for lib_root in all_library_roots
+    ]
 
-    for i, node in enumerate(nodes):
-        node_name = node.fullName()
-        node_class = node.Class()
+    # (entry_key, data_dict, absolute path to check, is sequence) for entries that reached the disk checks
+    pending_disk_checks: List[Tuple[str, Dict[str, Any], str, bool]] = []
+    # Resolved path -> (absolute path for checks, matched library root or None). Many Read nodes share
+    # the same plate or LUT, so absolutizing and root matching run once per distinct path.
+    resolved_path_cache: Dict[str, Tuple[str, Optional[str]]] = {}
+
+    total_nodes = len(nodes)
+    # Walk in full-name order rather than set (object hash) order, so dependency_info, the copy map
+    # built from it and the JSON report come out in the same order on every run of the same script.
+    for i, node in enumerate(sorted(nodes, key=_full_name)):
+        if i and i % 500 == 0: # Coarse progress instead of per-node lines
+            _log("info", f"Scanned {i}/{total_nodes} nodes for dependencies...")
+        node_name = _full_name(node)
+        node_class = _node_class(node)
         knobs_to_process: List[Tuple[str, nuke.Knob, str]] = []
 
-        if node_class in READ_NODE_CLASSES:
-            read_knobs_to_check_map: Dict[str, nuke.Knob] = {}
-            read_knobs_to_check_map['file'] = node.knob('file')
-            read_knobs_to_check_map['proxy'] = node.knob('proxy')
-            if node_class == "OCIOFileTransform": read_knobs_to_check_map['cccid'] = node.knob('cccid')
-            if node_class == "Vectorfield": read_knobs_to_check_map['vfield_file'] = node.knob('vfield_file')
-            for knob_name, knob_obj in read_knobs_to_check_map.items():
+        read_knob_names = READ_CLASS_FILE_KNOBS.get(node_class)
+        if read_knob_names is not None:
+            for knob_name in read_knob_names:
+                knob_obj = node.knob(knob_name)
                 if knob_obj:
                     knobs_to_process.append((knob_name, knob_obj, ELEMENTS_REL))
         elif node_class in WRITE_NODE_CLASSES:
@@ -361,7 +506,7 @@ def _collect_dependency_paths(
             proxy_knob = node.knob('proxy')
             if proxy_knob and proxy_knob.value():
                 knobs_to_process.append(('proxy', proxy_knob, PUBLISH_REL))
-        elif _is_valid_writefix(node):
+        elif _is_write_output(node): # Not a Write class here, so this is the (cached) WriteFix check
             profile_knob = node.knob('profile')
             if profile_knob:
                 profile_value = profile_knob.value()
@@ -371,7 +516,7 @@ def _collect_dependency_paths(
                     if location_knob:
                         knobs_to_process.append((location_knob_name, location_knob, PUBLISH_REL))
                     else:
-                        _log_print("warning", f"WriteFix '{node_name}': Could not find location knob '{location_knob_name}' for profile '{profile_value}'.")
+                        _log("warning", f"WriteFix '{node_name}': Could not find location knob '{location_knob_name}' for profile '{profile_value}'.")
 
         for knob_name, knob, initial_category_hint in knobs_to_process:
             entry_key = f"{node_name}.{knob_name}"
@@ -391,124 +536,164 @@ def _collect_dependency_paths(
                 data_dict["original_script_value"] = str(original_script_value).replace("\\", "/") if original_script_value else None # Corrected: single backslash
 
                 if not original_script_value:
-                    _log_print("debug", f"  Knob '{knob_name}' on '{node_name}' is empty. Skipping.")
+                    if knob_resolutions is not None:
+                        knob_resolutions[entry_key] = (node, knob, original_script_value, None, None)
+                    _log("debug", "  Knob '%s' on '%s' is empty. Skipping.", knob_name, node_name)
                     dependency_details[entry_key] = data_dict
                     continue
 
                 resolved_path_in_nuke_str = None
+                evaluated_knob_value = original_script_value # Raw evaluate() result, before sequence pattern handling
                 if isinstance(knob, nuke.Text_Knob):
                     resolved_path_in_nuke_str = original_script_value
                 elif hasattr(knob, 'evaluate'):
                     try:
                         original_has_pattern = is_sequence_pattern(original_script_value)
                         resolved_path = knob.evaluate()
+                        evaluated_knob_value = resolved_path
                         if original_has_pattern and resolved_path: # Ensure resolved_path is not None
-                            resolved_path_parent = Path(resolved_path).parent
-                            original_filename = Path(original_script_value).name
-                            resolved_path_in_nuke_str = str(resolved_path_parent / original_filename)
-                            _log_print("debug", f"    Preserved original sequence pattern: '{original_script_value}' -> '{resolved_path_in_nuke_str}'")
+                            # Path keeps bare filenames and trailing-slash values intact; only sequence knobs get here
+                            resolved_path_in_nuke_str = str(Path(resolved_path).parent / Path(original_script_value).name)
+                            _log("debug", "    Preserved original sequence pattern: '%s' -> '%s'", original_script_value, resolved_path_in_nuke_str)
                         else:
                             resolved_path_in_nuke_str = resolved_path
                     except Exception as eval_e:
-                        _log_print("warning", f"    Error evaluating knob '{knob_name}' on '{node_name}': {eval_e}. Falling back.")
+                        _log("warning", f"    Error evaluating knob '{knob_name}' on '{node_name}': {eval_e}. Falling back.")
                         resolved_path_in_nuke_str = original_script_value
                 else:
                     resolved_path_in_nuke_str = original_script_value
 
+                # Without sequence pattern preservation the path checked below is exactly the repath lookup key
+                lookup_path_reusable = resolved_path_in_nuke_str == evaluated_knob_value
+                if knob_resolutions is not None:
+                    knob_resolutions[entry_key] = (node, knob, original_script_value, evaluated_knob_value, None)
+
                 if not resolved_path_in_nuke_str:
-                    _log_print("debug", f"  Knob '{knob_name}' on '{node_name}' produced no resolved path. Skipping.")
+                    _log("debug", "  Knob '%s' on '%s' produced no resolved path. Skipping.", knob_name, node_name)
                     dependency_details[entry_key] = data_dict
                     continue
                 
                 resolved_path_in_nuke_str = str(resolved_path_in_nuke_str).replace("\\", "/") # Corrected: single backslash
                 data_dict["resolved_path_in_nuke"] = resolved_path_in_nuke_str
                 
-                path_for_checks_str = resolved_path_in_nuke_str
-                if script_dir and not os.path.isabs(path_for_checks_str):
-                    path_for_checks_str = os.path.abspath(os.path.join(script_dir, path_for_checks_str))
-                    path_for_checks_str = str(path_for_checks_str).replace("\\", "/") # Corrected: single backslash
-                    _log_print("debug", f"    Absolutized '{resolved_path_in_nuke_str}' to '{path_for_checks_str}' for checks.")
-                elif not os.path.isabs(path_for_checks_str):
-                     _log_print("warning", f"    Path '{path_for_checks_str}' is relative but script_dir unavailable. Checks might be inaccurate.")
-
-                path_for_checks_obj = Path(path_for_checks_str)
+                cached_path = resolved_path_cache.get(resolved_path_in_nuke_str)
+                if cached_path is not None:
+                    path_for_checks_str, matched_lib_root = cached_path
+                else:
+                    path_for_checks_str = resolved_path_in_nuke_str
+                    if script_dir and not os.path.isabs(path_for_checks_str):
+                        path_for_checks_str = os.path.abspath(os.path.join(script_dir, path_for_checks_str))
+                        path_for_checks_str = str(path_for_checks_str).replace("\\", "/") # Corrected: single backslash
+                        _log("debug", "    Absolutized '%s' to '%s' for checks.", resolved_path_in_nuke_str, path_for_checks_str)
+                    elif not os.path.isabs(path_for_checks_str):
+                         _log("warning", f"    Path '{path_for_checks_str}' is relative but script_dir unavailable. Checks might be inaccurate.")
+
+                    matched_lib_root = None
+                    path_to_categorize_lower = path_for_checks_str.lower()
+                    for lib_root_str, lib_root_prefix in library_root_prefixes:
+                        if path_to_categorize_lower.startswith(lib_root_prefix):
+                            matched_lib_root = lib_root_str
+                            break
+                    resolved_path_cache[resolved_path_in_nuke_str] = (path_for_checks_str, matched_lib_root)
+
+                if knob_resolutions is not None and lookup_path_reusable:
+                    knob_resolutions[entry_key] = (node, knob, original_script_value, evaluated_knob_value, path_for_checks_str)
+
                 is_potential_sequence = is_sequence_pattern(data_dict["original_script_value"]) or \
                                         is_sequence_pattern(resolved_path_in_nuke_str)
                 if is_potential_sequence:
-                    _log_print("debug", f"    Detected sequence pattern in '{path_for_checks_str}' (Original: '{data_dict['original_script_value']}', ResolvedNuke: '{resolved_path_in_nuke_str}')")
+                    _log("debug", "    Detected sequence pattern in '%s' (Original: '%s', ResolvedNuke: '%s')", path_for_checks_str, data_dict['original_script_value'], resolved_path_in_nuke_str)
 
                 # Step 1: Determine final dependency_category and matched_library_root
                 data_dict["dependency_category"] = initial_category_hint
-                data_dict["matched_library_root"] = None
-                
-                path_to_categorize_obj = path_for_checks_obj
-                for lib_root in all_library_roots:
-                    try:
-                        normalized_lib_root_str = str(lib_root).replace("\\", "/").rstrip("/") # Corrected: single backslash
-                        normalized_path_to_categorize_str = str(path_to_categorize_obj).replace("\\", "/") # Corrected: single backslash
-                        if normalized_path_to_categorize_str.lower().startswith(normalized_lib_root_str.lower() + "/"):
-                            data_dict["dependency_category"] = ASSETS_REL
-                            data_dict["matched_library_root"] = str(lib_root)
-                            _log_print("debug", f"    Categorized '{path_for_checks_str}' as '{ASSETS_REL}' based on root '{lib_root}'")
-                            break
-                    except Exception as e_cat:
-                        _log_print("warning", f"    Error during library root comparison for '{path_to_categorize_obj}' against '{lib_root}': {e_cat}")
-                
-                if data_dict["dependency_category"] == initial_category_hint:
-                     _log_print("debug", f"    Path '{path_for_checks_str}' not in library roots. Using initial hint: '{initial_category_hint}'")
-
-                # Step 2: Determine source_item_on_disk and is_source_directory
-                data_dict["source_item_on_disk"] = path_for_checks_str
-                data_dict["is_source_directory"] = path_for_checks_obj.is_dir()
-
-                # Rule: For input sequences (ASSETS_REL or ELEMENTS_REL), target their parent directory.
-                if is_potential_sequence and data_dict["dependency_category"] != PUBLISH_REL:
-                    if not path_for_checks_obj.is_dir(): # Only if the path itself isn't already a directory
-                        parent_dir = path_for_checks_obj.parent
-                        data_dict["source_item_on_disk"] = str(parent_dir).replace("\\", "/") # Corrected: single backslash
-                        data_dict["is_source_directory"] = True
-                        _log_print("info", f"    Input sequence '{path_for_checks_str}' (Cat: {data_dict['dependency_category']}). Targeting parent dir for archive: '{data_dict['source_item_on_disk']}'.")
-
-                # Step 3: Determine exists_on_disk for the (potentially updated) source_item_on_disk
-                source_item_to_check_obj = Path(data_dict["source_item_on_disk"])
-                if data_dict["is_source_directory"]:
-                    data_dict["exists_on_disk"] = source_item_to_check_obj.is_dir()
-                    if not data_dict["exists_on_disk"]:
-                        if is_potential_sequence and data_dict["dependency_category"] != PUBLISH_REL and data_dict["source_item_on_disk"] != path_for_checks_str: # i.e. we changed it to parent
-                             _log_print("warning", f"    Targeted parent directory '{data_dict['source_item_on_disk']}' for INPUT sequence '{path_for_checks_str}' does not exist or is not a directory.")
-                        else:
-                             _log_print("debug", f"    Targeted directory '{data_dict['source_item_on_disk']}' does not exist or is not a directory.")
+                data_dict["matched_library_root"] = matched_lib_root
+
+                if matched_lib_root is not None:
+                    data_dict["dependency_category"] = ASSETS_REL
+                    _log("debug", "    Categorized '%s' as '%s' based on root '%s'", path_for_checks_str, ASSETS_REL, matched_lib_root)
                 else:
-                    data_dict["exists_on_disk"] = source_item_to_check_obj.exists()
-                    if not data_dict["exists_on_disk"]:
-                         _log_print("debug", f"    File/Pattern '{data_dict['source_item_on_disk']}' does not exist on disk.")
-                
-                _log_print("debug", f"  Collected for '{entry_key}': "
-                                   f"Orig='{data_dict['original_script_value']}', "
-                                   f"ResolvedNuke='{data_dict['resolved_path_in_nuke']}', "
-                                   f"SourceDisk='{data_dict['source_item_on_disk']}', "
-                                   f"Cat='{data_dict['dependency_category']}', "
-                                   f"MatchedRoot='{data_dict['matched_library_root']}', "
-                                   f"IsDir='{data_dict['is_source_directory']}', "
-                                   f"Exists='{data_dict['exists_on_disk']}'")
+                     _log("debug", "    Path '%s' not in library roots. Using initial hint: '%s'", path_for_checks_str, initial_category_hint)
+
+                # Steps 2 and 3 need the filesystem; they run for all entries after the loop,
+                # with the stat calls for unique paths spread over a thread pool.
+                pending_disk_checks.append((entry_key, data_dict, path_for_checks_str, is_potential_sequence))
 
             except Exception as e:
                 error_msg = f"Error processing knob '{knob_name}' for '{node_name}': {e}"
-                _log_print("error", error_msg)
-                _log_print("error", traceback.format_exc())
+                _log("error", error_msg)
+                if _DEBUG_ENABLED:
+                    _log("debug", traceback.format_exc())
                 data_dict["error"] = error_msg
             
             dependency_details[entry_key] = data_dict
 
-    _log_print("info", f"Collected details for {len(dependency_details)} file dependency paths.")
+    if pending_disk_checks:
+        _log("info", f"Checking {len(pending_disk_checks)} dependency paths on disk...")
+        path_stats = _stat_paths({path for _, _, path, _ in pending_disk_checks})
+
+        # Step 2: Determine source_item_on_disk and is_source_directory
+        for entry_key, data_dict, path_for_checks_str, is_potential_sequence in pending_disk_checks:
+            path_is_dir = path_stats[path_for_checks_str][1]
+            data_dict["source_item_on_disk"] = path_for_checks_str
+            data_dict["is_source_directory"] = path_is_dir
+
+            # Rule: For input sequences (ASSETS_REL or ELEMENTS_REL), target their parent directory.
+            if is_potential_sequence and data_dict["dependency_category"] != PUBLISH_REL:
+                if not path_is_dir: # Only if the path itself isn't already a directory
+                    parent_dir = Path(path_for_checks_str).parent
+                    data_dict["source_item_on_disk"] = str(parent_dir).replace("\\", "/") # Corrected: single backslash
+                    data_dict["is_source_directory"] = True
+                    _log("info", f"    Input sequence '{path_for_checks_str}' (Cat: {data_dict['dependency_category']}). Targeting parent dir for archive: '{data_dict['source_item_on_disk']}'.")
+
+        # Retargeted parent directories are the only paths not stat'ed above
+        path_stats.update(_stat_paths({
+            data_dict["source_item_on_disk"] for _, data_dict, _, _ in pending_disk_checks
+            if data_dict["source_item_on_disk"] not in path_stats
+        }))
+
+        # Step 3: Determine exists_on_disk for the (potentially updated) source_item_on_disk
+        for entry_key, data_dict, path_for_checks_str, is_potential_sequence in pending_disk_checks:
+            source_exists, source_is_dir = path_stats[data_dict["source_item_on_disk"]]
+            if data_dict["is_source_directory"]:
+                data_dict["exists_on_disk"] = source_is_dir
+                if not data_dict["exists_on_disk"]:
+                    if is_potential_sequence and data_dict["dependency_category"] != PUBLISH_REL and data_dict["source_item_on_disk"] != path_for_checks_str: # i.e. we changed it to parent
+                         _log("warning", f"    Targeted parent directory '{data_dict['source_item_on_disk']}' for INPUT sequence '{path_for_checks_str}' does not exist or is not a directory.")
+                    else:
+                         _log("debug", "    Targeted directory '%s' does not exist or is not a directory.", data_dict['source_item_on_disk'])
+            else:
+                data_dict["exists_on_disk"] = source_exists
+                if not data_dict["exists_on_disk"]:
+                     _log("debug", "    File/Pattern '%s' does not exist on disk.", data_dict['source_item_on_disk'])
+
+            _log("debug", "  Collected for '%s': Orig='%s', ResolvedNuke='%s', SourceDisk='%s', Cat='%s', MatchedRoot='%s', IsDir='%s', Exists='%s'", entry_key, data_dict['original_script_value'], data_dict['resolved_path_in_nuke'], data_dict['source_item_on_disk'], data_dict['dependency_category'], data_dict['matched_library_root'], data_dict['is_source_directory'], data_dict['exists_on_disk'])
+
+    _log("info", f"Collected details for {len(dependency_details)} file dependency paths.")
     try:
-        _log_print("debug", f"Full dependency_details collected: {json.dumps(dependency_details, indent=2)}")
+        if _DEBUG_ENABLED:
+            _log("debug", "Full dependency_details collected: %s", json.dumps(dependency_details, indent=2))
     except TypeError:
-        _log_print("warning", "Could not serialize dependency_details to JSON for full logging.")
+        _log("warning", "Could not serialize dependency_details to JSON for full logging.")
 
     return dependency_details
 
 
+@functools.lru_cache(maxsize=1)
+def _native_plugins() -> frozenset:
+    """Names of plugins found on Nuke's plugin path; scanned once per process."""
+    return frozenset(nuke.plugins(nuke.ALL | nuke.NODIR))
+
+
+@functools.lru_cache(maxsize=1)
+def _nuke_plugins_dir() -> str:
+    """
+    Lower-cased forward-slash prefix (with trailing '/') of the plugins folder inside the
+    Nuke install, for a plain startswith test against normalized gizmo paths.
+    """
+    nuke_install_dir = Path(nuke.env['ExecutablePath']).parent.parent # Go up two levels typically
+    return (str(nuke_install_dir / 'plugins').replace("\\", "/").rstrip("/") + "/").lower()
+
+
 def _bake_gizmos(nodes_to_check: Set[nuke.Node]) -> Tuple[int, Set[nuke.Node]]:
     """
     Bakes non-native gizmos within the provided set of nodes *in place*.
@@ -518,25 +703,36 @@ def _bake_gizmos(nodes_to_check: Set[nuke.Node]) -> Tuple[int, Set[nuke.Node]]:
     _log_print("info", "Starting gizmo baking process...")
     baked_count = 0
     try:
-        native_plugins = set(nuke.plugins(nuke.ALL | nuke.NODIR))
-        _log_print("debug", f"Using {len(native_plugins)} native plugins for exclusion.")
+        native_plugins = _native_plugins()
+        _log_print("debug", "Using %d native plugins for exclusion.", len(native_plugins))
     except Exception as e:
         _log_print("warning", f"Could not get native plugins list: {e}. Exclusion less accurate.")
-        native_plugins = set()
+        native_plugins = frozenset()
 
-    current_nodes = list(nodes_to_check) # Iterate over a copy
-    updated_node_set = set(nodes_to_check) # Set to store final nodes
+    try:
+        plugins_prefix = _nuke_plugins_dir()
+    except Exception as e:
+        _log_print("warning", f"Could not resolve Nuke plugins directory: {e}. All file-based gizmos will be baked.")
+        plugins_prefix = None
+
+    # Baking swaps gizmos for groups; record the swaps and apply them once after the loop
+    # so nodes_to_check can be iterated directly without a snapshot copy.
+    to_remove: Set[nuke.Node] = set()
+    to_add: Set[nuke.Node] = set()
 
     processed_for_baking: Set[str] = set()
 
-    for node in current_nodes:
+    for node in nodes_to_check:
+        node_name = _full_name(node)
+        if node_name in processed_for_baking:
+            continue
         # Check if node still exists (might have been replaced by baking earlier in loop?)
-        # Using node name check is safer than object identity after potential replacement
-        if not nuke.exists(node.fullName()) or node.fullName() in processed_for_baking:
+        # Using node name check is safer than object identity after potential replacement.
+        # Nothing can have been removed before the first bake, so only look it up after one.
+        if baked_count and not nuke.exists(node_name):
             continue
 
-        node_name = node.fullName()
-        node_class = node.Class()
+        node_class = _node_class(node)
         can_be_baked = hasattr(node, 'makeGroup')
 
         if not can_be_baked: continue
@@ -550,11 +746,8 @@ def _bake_gizmos(nodes_to_check: Set[nuke.Node]) -> Tuple[int, Set[nuke.Node]]:
              # Check if it's in standard Nuke plugin paths
              in_nuke_plugins_dir = False
              try:
-                  gizmo_filename = node.filename()
-                  if gizmo_filename:
-                       nuke_install_dir = Path(nuke.env['ExecutablePath']).parent.parent # Go up two levels typically
-                       if Path(gizmo_filename).is_relative_to(nuke_install_dir / 'plugins'):
-                            in_nuke_plugins_dir = True
+                  gizmo_filename = (node.filename() or "").replace("\\", "/").lower()
+                  in_nuke_plugins_dir = plugins_prefix is not None and gizmo_filename.startswith(plugins_prefix)
              except Exception as path_e:
                   _log_print("warning", f"Error checking path for gizmo {node_name}: {path_e}")
 
@@ -571,12 +764,13 @@ def _bake_gizmos(nodes_to_check: Set[nuke.Node]) -> Tuple[int, Set[nuke.Node]]:
                   baked_group = node.makeGroup() # Perform the bake
 
                   if baked_group:
-                      baked_name = baked_group.fullName()
+                      baked_name = _full_name(baked_group) # Primes the cache for collection, repathing and saving
                       _log_print("info", f"Successfully baked '{node_name}' to Group '{baked_name}'")
                       baked_count += 1
                       # Update the working set: remove original node, add baked group
-                      updated_node_set.discard(node) # Remove original node object
-                      updated_node_set.add(baked_group) # Add the new group object
+                      to_remove.add(node) # Remove original node object
+                      _forget_node(node, node_name) # Original no longer exists; drop its cached name
+                      to_add.add(baked_group) # Add the new group object
                       processed_for_baking.add(node_name) # Mark original name as processed
                       processed_for_baking.add(baked_name) # Mark new group as processed (don't try to bake it)
                   else:
@@ -584,43 +778,49 @@ def _bake_gizmos(nodes_to_check: Set[nuke.Node]) -> Tuple[int, Set[nuke.Node]]:
                       processed_for_baking.add(node_name) # Mark as processed even if failed
 
              except Exception as bake_error:
-                  _log_print("error", f"Error baking gizmo '{node_name}': {bake_error}\n{traceback.format_exc()}")
+                  _log_print("error", f"Error baking gizmo '{node_name}': {bake_error}")
+                  if _DEBUG_ENABLED:
+                      _log_print("debug", traceback.format_exc())
                   processed_for_baking.add(node_name) # Mark as processed even on error
 
+    updated_node_set = (nodes_to_check - to_remove) | to_add if baked_count else nodes_to_check
     _log_print("info", f"Gizmo baking finished. Baked {baked_count} gizmos.")
     return baked_count, updated_node_set
 
 
-def _calculate_relative_path_nuke(source_script_abs: str, target_dependency_abs: str) -> str:
-    """Calculates relative path within Nuke env, falling back to absolute."""
+def _calculate_relative_path_nuke(source_dir: str, target_dependency_abs: str) -> str:
+    """
+    Calculates relative path within Nuke env, falling back to absolute.
+    source_dir is the forward-slash directory of the script the path will be stored in;
+    callers compute it once rather than per knob.
+    """
+    target = str(target_dependency_abs).replace("\\", "/")
     try:
-        norm_script_path = Path(str(source_script_abs).replace("\\", "/"))
-        norm_target_path = Path(str(target_dependency_abs).replace("\\", "/"))
-        source_dir = norm_script_path.parent
         # Use os.path.relpath for cross-drive compatibility if needed
-        relative = os.path.relpath(norm_target_path, source_dir)
-        nuke_relative_path = relative.replace("\\", "/")
-        _log_print("debug", f"Calculated relative path: '{nuke_relative_path}' (from '{source_dir}' to '{norm_target_path}')")
+        nuke_relative_path = os.path.relpath(target, source_dir).replace("\\", "/")
+        _log_print("debug", "Calculated relative path: '%s' (from '%s' to '%s')", nuke_relative_path, source_dir, target)
         return nuke_relative_path
     except ValueError as e: # Handles different drives on Windows
-        abs_target_nuke = str(target_dependency_abs).replace("\\", "/")
-        _log_print("warning", f"Could not make relative path ('{source_script_abs}' -> '{target_dependency_abs}'): {e}. Using absolute: {abs_target_nuke}")
-        return abs_target_nuke
+        _log_print("warning", f"Could not make relative path ('{source_dir}' -> '{target_dependency_abs}'): {e}. Using absolute: {target}")
+        return target
     except Exception as e:
-        abs_target_nuke = str(target_dependency_abs).replace("\\", "/")
-        _log_print("error", f"Unexpected error calculating relative path ('{source_script_abs}' -> '{target_dependency_abs}'): {e}. Using absolute: {abs_target_nuke}")
-        return abs_target_nuke
+        _log_print("error", f"Unexpected error calculating relative path ('{source_dir}' -> '{target_dependency_abs}'): {e}. Using absolute: {target}")
+        return target
 
 
 def _repath_nodes(
     nodes_to_repath: Set[nuke.Node],
     dependency_map: Dict[str, str], # {original_evaluated_abs: final_archived_abs}
-    final_script_archive_path: str
+    final_script_archive_path: str,
+    knob_resolutions: Optional[Dict[str, Tuple[nuke.Node, nuke.Knob, Any, Any, Optional[str]]]] = None
 ) -> int:
     """
     Repaths file knobs within the given set of nodes *in memory*.
     Uses relative paths calculated against the final script destination.
     The dependency_map now contains rich info: {resolved_path_in_nuke: {destination_path: ..., ...}}
+    knob_resolutions, as filled by _collect_dependency_paths, supplies knob objects,
+    already-evaluated values and, where available, the already-absolutized map lookup path;
+    knobs missing from it are looked up, evaluated and resolved here.
     Returns the number of successful repath operations.
     """
     _log_print("info", f"Starting repathing process for {len(nodes_to_repath)} nodes...")
@@ -639,110 +839,134 @@ def _repath_nodes(
         except RuntimeError as e:
             _log_print("warning", f"Could not get script name for resolving relative paths during repathing: {e}")
 
+    # Relative paths are written against the final archived script location, the same for every knob
+    archive_script_dir = os.path.dirname(str(final_script_archive_path).replace("\\", "/"))
+
     # Create a reverse map for faster lookup if needed, but iterating nodes is likely clearer
     # archived_to_original = {v: k for k, v in dependency_map.items() if v}
 
-    for node in nodes_to_repath:
-        node_name = node.fullName()
-        node_class = node.Class()
-        knobs_to_check = {}
-        # Identify potential file knobs on this node
-        if node_class in READ_NODE_CLASSES | WRITE_NODE_CLASSES:
-             knobs_to_check['file'] = node.knob('file')
-             knobs_to_check['proxy'] = node.knob('proxy')
-             if node_class == "OCIOFileTransform": knobs_to_check['cccid'] = node.knob('cccid')
-             if node_class == "Vectorfield": knobs_to_check['vfield_file'] = node.knob('vfield_file')
-             # For WriteFix, the specific location knob (e.g. 'comp_location') would need to be identified here
-             # However, repathing WriteFix output paths is less common. Current collection gets them into dependency_info.
-             # If repathing them becomes a requirement, this section needs more specific logic for WriteFix.
-
-        for knob_name, knob in knobs_to_check.items():
-            if not knob: continue
-
-            current_knob_value_path = None # Path from knob.value()
-            current_resolved_path_for_knob = None # Path after .evaluate() or special handling
-
-            try:
-                current_knob_value_path = knob.value() # This is the 'original_path'
-                if not current_knob_value_path: continue
+    # The script is saved straight after repathing and never undone; recording an undo
+    # step for every setValue is pure overhead on scripts with many file knobs.
+    undo_disabled = False
+    try:
+        nuke.Undo.disable()
+        undo_disabled = True
+    except Exception as e:
+        _log_print("warning", f"Could not disable undo during repathing: {e}")
 
-                # Determine the resolved path for this specific knob, similar to collection logic
-                if isinstance(knob, nuke.Text_Knob):
-                    current_resolved_path_for_knob = current_knob_value_path
-                elif hasattr(knob, 'evaluate'):
-                    try:
-                        current_resolved_path_for_knob = knob.evaluate()
-                    except Exception:
-                        current_resolved_path_for_knob = current_knob_value_path # Fallback
+    try:
+        for node in nodes_to_repath:
+            node_name = _full_name(node)
+            node_class = _node_class(node)
+            # Identify potential file knobs on this node
+            # For WriteFix, the specific location knob (e.g. 'comp_location') would need to be identified here
+            # However, repathing WriteFix output paths is less common. Current collection gets them into dependency_info.
+            # If repathing them becomes a requirement, this section needs more specific logic for WriteFix.
+            for knob_name in REPATH_CLASS_FILE_KNOBS.get(node_class, ()):
+                cached_resolution = knob_resolutions.get(f"{node_name}.{knob_name}") if knob_resolutions else None
+                if cached_resolution is not None and cached_resolution[0] is not node:
+                    cached_resolution = None # Name now belongs to another node (e.g. a baked gizmo); read afresh
+                if cached_resolution is not None:
+                    knob = cached_resolution[1] # Same node object as collection: reuse its knob
                 else:
-                    current_resolved_path_for_knob = current_knob_value_path
-
-
-                if not current_resolved_path_for_knob: continue # Skip if no resolved path
-
-                # Resolve if relative and normalize (using current_resolved_path_for_knob)
-                path_to_check_in_map = ""
-                if script_dir and not os.path.isabs(current_resolved_path_for_knob): 
-                     path_to_check_in_map = os.path.abspath(os.path.join(script_dir, current_resolved_path_for_knob))
-                elif not os.path.isabs(current_resolved_path_for_knob) and not script_dir:
-                     # Cannot resolve, but keep it to see if it's in the map as a relative key (unlikely for repath map)
-                     path_to_check_in_map = current_resolved_path_for_knob 
-                     _log_print("warning", f"Cannot resolve relative path '{current_resolved_path_for_knob}' for '{node_name}.{knob_name}' during repath as script directory is unavailable. Path kept as original for map lookup.")
-                else: # Is absolute or already resolved
-                     path_to_check_in_map = current_resolved_path_for_knob
-
-                path_to_check_in_map = str(path_to_check_in_map).replace("\\", "/")
-
-                # Check if this resolved path is one we archived and needs repathing
-                if path_to_check_in_map in dependency_map:
-                    dependency_details = dependency_map[path_to_check_in_map]
-                    final_archived_path = dependency_details.get("destination_path") # Get from dict
-                    source_on_disk_for_repath = dependency_details.get("source_item_on_disk")
-                    is_dir_for_repath = dependency_details.get("is_source_directory")
-
-                    if final_archived_path:
-                        # If the original knob value pointed to a directory (e.g. a folder knob, or a sequence we decided to copy as parent dir),
-                        # and repathing is turning it into a relative path to that directory, that's usually fine.
-                        # If the original knob was for a file/pattern, and final_archived_path is a directory (because we archived parent for sequence),
-                        # we need to be careful. The repathing should point to the *original item within that directory* if it was a file/pattern.
-                        # However, the current _calculate_relative_path_nuke expects final_archived_path to be the specific item.
-
-                        # If the source_item_on_disk (which determined the final_archived_path structure) was a directory,
-                        # but the knob originally pointed to a file/pattern *inside* it (e.g. seq pattern), then
-                        # we need to reconstruct the relative path to that pattern *within* the archived directory structure.
-                        path_to_set_on_knob = ""
-
-                        if is_dir_for_repath and Path(source_on_disk_for_repath) == Path(path_to_check_in_map).parent and not Path(path_to_check_in_map).is_dir():
-                            # This means: we archived the parent directory (source_on_disk_for_repath)
-                            # because the knob pointed to a sequence (path_to_check_in_map, which is not a dir itself).
-                            # The final_archived_path corresponds to this parent directory.
-                            # We need the knob to point to the sequence pattern *relative to* the script location, but *within* the archived parent dir structure.
-                            # Example: script at archive/proj/nuke/script.nk
-                            #          archived dir at archive/FixFX/elements/my_seq_folder/
-                            #          original sequence was Z:/shot/my_seq_folder/img.####.exr
-                            #          knob should be repathed to ../../FixFX/elements/my_seq_folder/img.####.exr
-
-                            original_filename = Path(path_to_check_in_map).name # e.g., img.####.exr
-                            archived_item_specific_path = Path(final_archived_path) / original_filename
-                            path_to_set_on_knob = _calculate_relative_path_nuke(final_script_archive_path, str(archived_item_specific_path))
-                            _log_print("debug", f"  Repath detail: Knob was sequence pattern '{path_to_check_in_map}', parent dir '{source_on_disk_for_repath}' archived to '{final_archived_path}'. Repathing to specific item '{path_to_set_on_knob}'")
-                        else:
-                            # Standard case: final_archived_path is the direct counterpart to path_to_check_in_map (file or dir)
-                            path_to_set_on_knob = _calculate_relative_path_nuke(final_script_archive_path, final_archived_path)
+                    knob = node.knob(knob_name)
+                if not knob: continue
 
-                        knob.setValue(path_to_set_on_knob)
-                        _log_print("debug", f"Repathed '{node_name}.{knob_name}': Original Script Value='{current_knob_value_path}', ResolvedToMapKey='{path_to_check_in_map}' -> New Script Value='{path_to_set_on_knob}'")
-                        repath_count += 1
-                    else:
-                        _log_print("warning", f"Skipping repath for '{node_name}.{knob_name}': Resolved path '{path_to_check_in_map}' found in map, but no valid 'destination_path' provided or archive failed.")
-                        failed_repaths.append(f"{node_name}.{knob_name} (no valid destination_path in map or archive failed for resolved path)")
-                # else:
-                     # _log_print("debug", f"Path '{path_to_check_in_map}' (from resolved '{current_resolved_path_for_knob}') not in archive map for {node_name}.{knob_name}. Skipping repath.")
+                current_knob_value_path = None # Path from knob.value()
+                current_resolved_path_for_knob = None # Path after .evaluate() or special handling
+                path_to_check_in_map = None
 
-            except Exception as e:
-                 _log_print("error", f"Error during repathing '{node_name}.{knob_name}' (Original Script Value: {current_knob_value_path}, Resolved Attempted: {current_resolved_path_for_knob}): {e}")
-                 _log_print("error", traceback.format_exc())
-                 failed_repaths.append(f"{node_name}.{knob_name} (error: {e})")
+                try:
+                    if cached_resolution is not None:
+                        # Evaluated during collection on this same node; knob.evaluate() can be costly (TCL expansion)
+                        _, _, current_knob_value_path, current_resolved_path_for_knob, path_to_check_in_map = cached_resolution
+                    else:
+                        current_knob_value_path = knob.value() # This is the 'original_path'
+                        if not current_knob_value_path: continue
+
+                        # Determine the resolved path for this specific knob, similar to collection logic
+                        if isinstance(knob, nuke.Text_Knob):
+                            current_resolved_path_for_knob = current_knob_value_path
+                        elif hasattr(knob, 'evaluate'):
+                            try:
+                                current_resolved_path_for_knob = knob.evaluate()
+                            except Exception:
+                                current_resolved_path_for_knob = current_knob_value_path # Fallback
+                        else:
+                            current_resolved_path_for_knob = current_knob_value_path
+
+
+                    if not current_resolved_path_for_knob: continue # Skip if no resolved path
+
+                    # Resolve if relative and normalize (using current_resolved_path_for_knob),
+                    # unless collection already did it for this knob
+                    if path_to_check_in_map is None:
+                        if script_dir and not os.path.isabs(current_resolved_path_for_knob): 
+                             path_to_check_in_map = os.path.abspath(os.path.join(script_dir, current_resolved_path_for_knob))
+                        elif not os.path.isabs(current_resolved_path_for_knob) and not script_dir:
+                             # Cannot resolve, but keep it to see if it's in the map as a relative key (unlikely for repath map)
+                             path_to_check_in_map = current_resolved_path_for_knob 
+                             _log_print("warning", f"Cannot resolve relative path '{current_resolved_path_for_knob}' for '{node_name}.{knob_name}' during repath as script directory is unavailable. Path kept as original for map lookup.")
+                        else: # Is absolute or already resolved
+                             path_to_check_in_map = current_resolved_path_for_knob
+
+                        path_to_check_in_map = str(path_to_check_in_map).replace("\\", "/")
+
+                    # Check if this resolved path is one we archived and needs repathing
+                    if path_to_check_in_map in dependency_map:
+                        dependency_details = dependency_map[path_to_check_in_map]
+                        final_archived_path = dependency_details.get("destination_path") # Get from dict
+                        source_on_disk_for_repath = dependency_details.get("source_item_on_disk")
+                        is_dir_for_repath = dependency_details.get("is_source_directory")
+
+                        if final_archived_path:
+                            # If the original knob value pointed to a directory (e.g. a folder knob, or a sequence we decided to copy as parent dir),
+                            # and repathing is turning it into a relative path to that directory, that's usually fine.
+                            # If the original knob was for a file/pattern, and final_archived_path is a directory (because we archived parent for sequence),
+                            # we need to be careful. The repathing should point to the *original item within that directory* if it was a file/pattern.
+                            # However, _calculate_relative_path_nuke expects final_archived_path to be the specific item.
+
+                            # If the source_item_on_disk (which determined the final_archived_path structure) was a directory,
+                            # but the knob originally pointed to a file/pattern *inside* it (e.g. seq pattern), then
+                            # we need to reconstruct the relative path to that pattern *within* the archived directory structure.
+                            path_to_set_on_knob = ""
+
+                            if is_dir_for_repath and Path(source_on_disk_for_repath) == Path(path_to_check_in_map).parent and not Path(path_to_check_in_map).is_dir():
+                                # This means: we archived the parent directory (source_on_disk_for_repath)
+                                # because the knob pointed to a sequence (path_to_check_in_map, which is not a dir itself).
+                                # The final_archived_path corresponds to this parent directory.
+                                # We need the knob to point to the sequence pattern *relative to* the script location, but *within* the archived parent dir structure.
+                                # Example: script at archive/proj/nuke/script.nk
+                                #          archived dir at archive/FixFX/elements/my_seq_folder/
+                                #          original sequence was Z:/shot/my_seq_folder/img.####.exr
+                                #          knob should be repathed to ../../FixFX/elements/my_seq_folder/img.####.exr
+
+                                original_filename = Path(path_to_check_in_map).name # e.g., img.####.exr
+                                archived_item_specific_path = Path(final_archived_path) / original_filename
+                                path_to_set_on_knob = _calculate_relative_path_nuke(archive_script_dir, str(archived_item_specific_path))
+                                _log_print("debug", "  Repath detail: Knob was sequence pattern '%s', parent dir '%s' archived to '%s'. Repathing to specific item '%s'", path_to_check_in_map, source_on_disk_for_repath, final_archived_path, path_to_set_on_knob)
+                            else:
+                                # Standard case: final_archived_path is the direct counterpart to path_to_check_in_map (file or dir)
+                                path_to_set_on_knob = _calculate_relative_path_nuke(archive_script_dir, final_archived_path)
+
+                            if path_to_set_on_knob != current_knob_value_path: # Skip no-op writes
+                                knob.setValue(path_to_set_on_knob)
+                            _log_print("debug", "Repathed '%s.%s': Original Script Value='%s', ResolvedToMapKey='%s' -> New Script Value='%s'", node_name, knob_name, current_knob_value_path, path_to_check_in_map, path_to_set_on_knob)
+                            repath_count += 1
+                        else:
+                            _log_print("warning", f"Skipping repath for '{node_name}.{knob_name}': Resolved path '{path_to_check_in_map}' found in map, but no valid 'destination_path' provided or archive failed.")
+                            failed_repaths.append(f"{node_name}.{knob_name} (no valid destination_path in map or archive failed for resolved path)")
+                    # else:
+                         # _log_print("debug", f"Path '{path_to_check_in_map}' (from resolved '{current_resolved_path_for_knob}') not in archive map for {node_name}.{knob_name}. Skipping repath.")
+
+                except Exception as e:
+                     _log_print("error", f"Error during repathing '{node_name}.{knob_name}' (Original Script Value: {current_knob_value_path}, Resolved Attempted: {current_resolved_path_for_knob}): {e}")
+                     if _DEBUG_ENABLED:
+                         _log_print("debug", traceback.format_exc())
+                     failed_repaths.append(f"{node_name}.{knob_name} (error: {e})")
+    finally:
+        if undo_disabled:
+            nuke.Undo.enable()
 
     _log_print("info", f"Repathing finished. Set {repath_count} knob values.")
     if failed_repaths:
@@ -750,15 +974,16 @@ def _repath_nodes(
     return repath_count
 
 # --- Main Executor Function and Task-Specific Functions ---
-def save_pruned_script(nodes: Set[nuke.Node], final_script_path: str, archive_root: str) -> str:
+def save_pruned_script(nodes: Set[nuke.Node], final_script_path: str) -> str:
     """
     Saves a new Nuke script containing only the specified nodes while retaining
     the original script's Root settings like format, frame range, and color settings.
+    Prunes the loaded script in place (deleting root-level nodes that are not required)
+    and saves it once, so the Root node is never cleared or re-read.
 
     Args:
         nodes: A set of nuke.Node instances to keep.
         final_script_path: Path where the new script should be saved.
-        archive_root: Root directory for the archive, used for temp file storage.
 
     Returns:
         Path to the saved .nk file.
@@ -767,116 +992,76 @@ def save_pruned_script(nodes: Set[nuke.Node], final_script_path: str, archive_ro
 
     if not final_script_path:
         raise ConfigurationError("Final script archive path is required for saving.")
-    
-    if not archive_root:
-        raise ConfigurationError("Archive root is required for saving (for temp operations).")
-    
-    # Backup Root node settings
-    root_data = nuke.root().writeKnobs(nuke.WRITE_ALL | nuke.TO_SCRIPT)
-    _log_print("debug", "Root settings serialized successfully")
-
-    # Deselect all and select only target nodes
-    for n_iter in nuke.allNodes(recurseGroups=True): # Renamed loop variable
-        n_iter.setSelected(False)
 
-    final_node_names = [n.fullName() for n in nodes if nuke.exists(n.fullName())]
-    nodes_selected_count = 0
+    # One lookup per node: nuke.toNode returns None for nodes that no longer exist
+    final_node_names: List[str] = []
     missing_final_nodes = []
-    for name in final_node_names:
-        node_to_select = nuke.toNode(name)
-        if node_to_select:
-            try:
-                node_to_select.setSelected(True)
-                nodes_selected_count += 1
-            except Exception as sel_e:
-                _log_print("warning", f"Could not select final node '{name}': {sel_e}")
+    for n in nodes:
+        name = _full_name(n)
+        if nuke.toNode(name) is not None: # Real lookup: this is the existence check after baking
+            final_node_names.append(name)
         else:
             _log_print("warning", f"Required node '{name}' not found in final state before saving.")
             missing_final_nodes.append(name)
 
-    if nodes_selected_count == 0:
+    # Only root-level nodes decide what ends up in the saved script (nested nodes live and die with
+    # their parent Group). Root-level nodes have no '.' in their full name.
+    kept_root_level_names = {name for name in final_node_names if '.' not in name}
+    nodes_kept_count = len(kept_root_level_names)
+
+    if nodes_kept_count == 0:
         if not final_node_names and not nodes: # nodes is the original set passed to function
              _log_print("warning", "Save operation called with an empty set of nodes initially. Resulting script will be empty but retain root settings.")
              # This case will lead to an empty script being saved, which is acceptable.
         else:
             # This case means nodes were expected (based on the 'nodes' input set or 'final_node_names' derived from it), 
-            # but none were selectable or found after processing. This is an error.
-            raise PruningError("No nodes were selected for saving. Pruning, baking might have removed all nodes, or selection failed for all expected nodes.")
+            # but none were found after processing. This is an error.
+            raise PruningError("No nodes were found for saving. Pruning, baking might have removed all nodes.")
 
-    _log_print("info", f"Selected {nodes_selected_count} final nodes for saving.")
+    _log_print("info", f"Keeping {nodes_kept_count} final root level nodes for saving.")
     if missing_final_nodes:
         _log_print("warning", f"Missing {len(missing_final_nodes)} required nodes in final state: {', '.join(missing_final_nodes)}")
 
-    temp_nodes_file = None
+    # Remove everything else from the live script. Required nodes form a closed upstream set, so
+    # nothing deleted here feeds a kept node.
+    root_level_nodes = nuke.allNodes()
+    if len(root_level_nodes) == nodes_kept_count:
+        # Every root node is required (kept names are a subset of existing root nodes): nothing to prune.
+        _log_print("info", "All root level nodes are required; saving script without pruning.")
+    else:
+        deleted_count = 0
+        for n_iter in root_level_nodes:
+            if _full_name(n_iter) in kept_root_level_names:
+                continue
+            try:
+                nuke.delete(n_iter)
+                deleted_count += 1
+            except Exception as del_e:
+                _log_print("warning", f"Could not remove unrequired node '{n_iter.fullName()}' before saving: {del_e}")
+        _log_print("info", f"Removed {deleted_count} unrequired root level nodes from the script.")
+
+    final_script_dir = os.path.dirname(final_script_path)
+    if final_script_dir: # Ensure directory exists only if path is not just a filename
+        _ensure_dir(final_script_dir)
+        _log_print("info", f"Ensured final script directory exists: {final_script_dir}")
+    
+    nuke.scriptSaveAs(filename=final_script_path, overwrite=1)
+    
+    # Verification after save (one stat call covers both existence and size)
     try:
-        temp_dir = os.path.join(archive_root, ".tmp") # Use archive_root for temp
-        os.makedirs(temp_dir, exist_ok=True)
-        _log_print("debug", f"Using custom temp directory for node copy: {temp_dir}")
-        
-        import uuid # Make sure uuid is imported if not already global for this script
-        temp_filename = f"nodes_for_pruned_script_{uuid.uuid4().hex}.nk"
-        temp_nodes_file = os.path.join(temp_dir, temp_filename)
-        
-        _log_print("debug", f"Saving selected nodes to custom temp file: {temp_nodes_file}")
-        if nodes_selected_count > 0: # Only copy if there are nodes selected
-            nuke.nodeCopy(temp_nodes_file)
-        else:
-            _log_print("info", "No nodes selected to copy to temp file; proceeding to save effectively empty script (with root settings).")
-            # Create an empty temp file so the rest of the logic doesn't break, ensuring it contains valid Nuke script header if needed by nodePaste
-            with open(temp_nodes_file, 'w') as f_temp:
-                f_temp.write("# Root settings preserved for empty script.\\nversion {}\nRoot {{\n inputs 0\n name Root\n}}\n")
+        final_script_size = os.stat(final_script_path).st_size
+    except FileNotFoundError:
+        raise ArchiverError(f"Final save failed: Output file '{final_script_path}' does not exist after save attempt.")
+    
+    if final_script_size == 0 and nodes_kept_count > 0:
+        # If nodes were kept, an empty file is an error.
+        raise ArchiverError(f"Final save produced an unexpectedly empty file: Output file '{final_script_path}' is empty despite {nodes_kept_count} nodes being kept.")
+    elif final_script_size == 0 and nodes_kept_count == 0:
+        _log_print("warning", f"Final saved script '{final_script_path}' is empty, but this was expected as no nodes were kept. Root settings should be present.")
 
+    _log_print("info", "Final script saved successfully.")
+    return final_script_path
 
-        nuke.scriptClear()
-        
-        try:
-            nuke.root().readKnobs(root_data)
-            _log_print("debug", "Root settings restored successfully")
-        except Exception as e_read_knobs:
-            _log_print("warning", f"Failed to fully restore root settings: {e_read_knobs}")
-        
-        # Only paste if there were nodes copied.
-        # If nodes_selected_count was 0, temp_nodes_file was created empty (or with minimal header)
-        # and nuke.nodePaste on such a file might be benign or raise an error depending on Nuke version.
-        # It's safer to only paste if we actually copied nodes.
-        if nodes_selected_count > 0 and os.path.exists(temp_nodes_file) and os.path.getsize(temp_nodes_file) > 0:
-            _log_print("debug", "Pasting nodes from custom temp file")
-            nuke.nodePaste(temp_nodes_file)
-        elif nodes_selected_count > 0 : 
-            # This case: nodes were expected, nodeCopy was called, but temp file is bad
-            _log_print("warning", f"Custom temp file '{temp_nodes_file}' is missing or empty after nodeCopy attempt despite having nodes selected. Resulting script might be missing nodes.")
-        else:
-            # nodes_selected_count == 0, script will be empty (plus root settings)
-            _log_print("info", "No nodes were pasted as no nodes were originally selected for copy.")
-            
-        final_script_dir = os.path.dirname(final_script_path)
-        if final_script_dir: # Ensure directory exists only if path is not just a filename
-            os.makedirs(final_script_dir, exist_ok=True)
-            _log_print("info", f"Ensured final script directory exists: {final_script_dir}")
-        
-        nuke.scriptSaveAs(filename=final_script_path, overwrite=1)
-        
-        # Verification after save
-        if not os.path.exists(final_script_path):
-            raise ArchiverError(f"Final save failed: Output file '{final_script_path}' does not exist after save attempt.")
-        
-        if os.path.getsize(final_script_path) == 0 and nodes_selected_count > 0:
-            # If nodes were selected, an empty file is an error.
-            raise ArchiverError(f"Final save produced an unexpectedly empty file: Output file '{final_script_path}' is empty despite {nodes_selected_count} nodes being selected.")
-        elif os.path.getsize(final_script_path) == 0 and nodes_selected_count == 0:
-            _log_print("warning", f"Final saved script '{final_script_path}' is empty, but this was expected as no nodes were selected/kept. Root settings should be present.")
-
-        _log_print("info", "Final script saved successfully.")
-        return final_script_path
-        
-    finally:
-        if temp_nodes_file and os.path.exists(temp_nodes_file):
-            try:
-                os.remove(temp_nodes_file)
-                _log_print("debug", f"Removed custom temp file: {temp_nodes_file}")
-            except Exception as e_remove:
-                _log_print("warning", f"Failed to remove custom temp file {temp_nodes_file}: {e_remove}")
-                
 def load_input_script(script_path: str) -> None:
     """
     Loads the input Nuke script.
@@ -896,7 +1081,8 @@ def identify_target_writes() -> List[nuke.Node]:
     if not write_node_names:
         raise PruningError("No valid Write/WriteFix nodes found to initiate pruning.")
     
-    target_write_nodes = [nuke.toNode(name) for name in write_node_names if nuke.toNode(name)]
+    # Names were just produced from live nodes, so _to_node resolves them from cache
+    target_write_nodes = [node for node in map(_to_node, write_node_names) if node]
     _log_print("info", f"Found {len(target_write_nodes)} target write nodes for dependency tracing.")
     return target_write_nodes
 
@@ -923,7 +1109,7 @@ def collect_required_nodes(compute_nodes: Set[nuke.Node], backdrop_nodes: Set[nu
     Returns the combined set and a sorted list of node names.
     """
     required_nodes = compute_nodes.union(backdrop_nodes)
-    required_node_names = sorted([n.fullName() for n in required_nodes])
+    required_node_names = sorted([_full_name(n) for n in required_nodes])
     _log_print("info", f"Total nodes required (including backdrops): {len(required_nodes)}")
     return required_nodes, required_node_names
 
@@ -960,99 +1146,120 @@ def generate_dependency_map(dependency_info: Dict[str, Dict[str, Any]], archive_
     The output dictionary value will contain 'destination_path', 'is_directory', and 'exists_on_disk'.
     """
     dependencies_to_copy: Dict[str, Dict[str, Any]] = {}
+    if not dependency_info: # Nothing collected (e.g. a script without file knobs); skip shot-code and SPT setup
+        _log_print("info", "No dependencies collected; dependencies_to_copy map is empty.")
+        return dependencies_to_copy
     _log_print("debug", "Generating final dependency map for copying...")
+    _log = _log_print # Local alias avoids a global lookup per log call in the per-dependency loop
     temp_metadata = metadata_dict
     
-    shot_code_parts = [
-        temp_metadata.get('episode'),
-        temp_metadata.get('sequence'),
-        temp_metadata.get('shot'),
-        temp_metadata.get('tag')
-    ]
-    if not all(shot_code_parts[:3]):
-        _log_print("error", "Cannot construct shot code for map generation: Missing episode, sequence, or shot in metadata.")
-        return {}
-    shot_code = '_'.join(filter(None, shot_code_parts))
-    _log_print("debug", f"Constructed shot code for path splitting: {shot_code}")
-
-    comp_work_images_re = re.compile(r"Comp/work/[^/]+/images/(.*)", re.IGNORECASE)
+    episode = temp_metadata.get('episode')
+    sequence = temp_metadata.get('sequence')
+    shot = temp_metadata.get('shot')
+    tag = temp_metadata.get('tag')
+    if not (episode and sequence and shot):
+        _log("error", "Cannot construct shot code for map generation: Missing episode, sequence, or shot in metadata.")
+        return dependencies_to_copy
+    shot_code = '_'.join([part for part in (episode, sequence, shot, tag) if part])
+    _log("debug", "Constructed shot code for path splitting: %s", shot_code)
+    # Precomputed needles for locating the shot code as a whole path component
+    shot_code_prefix = f"{shot_code}/"
+    shot_code_component = f"/{shot_code}/"
+    shot_code_suffix = f"/{shot_code}"
+
+    # SPT category base path per dependency category, computed once per category rather than per dependency
+    category_spt_path_cache: Dict[str, str] = {}
 
     for node_knob_identifier, data in dependency_info.items():
-        source_path_for_copy = data.get("source_item_on_disk")
+        # _collect_dependency_paths always sets every field, so index directly (EAFP) rather than .get()
+        try:
+            source_path_for_copy = data["source_item_on_disk"]
+            collection_error = data["error"]
+        except KeyError:
+            source_path_for_copy = collection_error = None
 
         if not source_path_for_copy:
-            _log_print("debug", f"Skipping mapping for item key \'{node_knob_identifier}\': Missing \'source_item_on_disk\'. Data: {data}")
+            _log("debug", "Skipping mapping for item key '%s': Missing 'source_item_on_disk'. Data: %s", node_knob_identifier, data)
             continue
 
-        if data.get("error"):
-            _log_print("debug", f"Skipping mapping for item key \'{node_knob_identifier}\' (\'{source_path_for_copy}\'): Error encountered during collection. Data: {data}")
+        if collection_error:
+            _log("debug", "Skipping mapping for item key '%s' ('%s'): Error encountered during collection. Data: %s", node_knob_identifier, source_path_for_copy, data)
             continue
 
-        normalized_source_path_for_copy = str(source_path_for_copy).replace("\\", "/")
-
-        if normalized_source_path_for_copy in dependencies_to_copy:
-            _log_print("debug", f"Skipping mapping for item key \'{node_knob_identifier}\': Source path \'{normalized_source_path_for_copy}\' already processed.")
+        if source_path_for_copy in dependencies_to_copy:
+            _log("debug", "Skipping mapping for item key '%s': Source path '%s' already processed.", node_knob_identifier, source_path_for_copy)
             continue
 
-        dependency_category = data.get("dependency_category", ELEMENTS_REL)
-        is_directory_to_copy = data.get("is_source_directory", False)
-        exists_on_disk = data.get("exists_on_disk", False)
+        # Already forward-slashed by _collect_dependency_paths. Collapse '//' and drop a trailing '/'
+        # before the string splitting below, as Path() did; the map stays keyed by the collected path.
+        normalized_source_path_for_copy = posixpath.normpath(source_path_for_copy)
 
-        _log_print("debug", f"generate_dependency_map: Processing SourceDisk=\'{normalized_source_path_for_copy}\', Category=\'{dependency_category}\', IsDirToCopy=\'{is_directory_to_copy}\', Exists=\'{exists_on_disk}\' (from item key: {node_knob_identifier})")
+        dependency_category = data["dependency_category"]
+        is_directory_to_copy = data["is_source_directory"]
+        exists_on_disk = data["exists_on_disk"]
+
+        _log("debug", "generate_dependency_map: Processing SourceDisk='%s', Category='%s', IsDirToCopy='%s', Exists='%s' (from item key: %s)", normalized_source_path_for_copy, dependency_category, is_directory_to_copy, exists_on_disk, node_knob_identifier)
 
         try:
-            category_spt_path = _get_spt_path(
-                str(archive_root),
-                temp_metadata,
-                dependency_category
-            )
-
-            source_path_obj = Path(normalized_source_path_for_copy)
-            path_parts = normalized_source_path_for_copy.split('/')
+            category_spt_path_str = category_spt_path_cache.get(dependency_category)
+            if category_spt_path_str is None:
+                category_spt_path = _get_spt_path(
+                    str(archive_root),
+                    temp_metadata,
+                    dependency_category
+                )
+                category_spt_path_str = str(category_spt_path).replace("\\", "/").rstrip("/")
+                category_spt_path_cache[dependency_category] = category_spt_path_str
+
+            # Item name via string ops (matches Path.name for forward-slash paths) to keep Path out of this loop
+            source_item_name = normalized_source_path_for_copy.rstrip('/').rpartition('/')[2]
             
             final_relative_part = ""
             shot_code_found_in_path = False
-            try:
-                shot_code_idx = -1
-                # For ASSETS_REL, we need to use the matched library root to determine the relative part.
-                if dependency_category == ASSETS_REL and data.get("matched_library_root"):
-                    matched_root_str = str(data["matched_library_root"]).replace("\\", "/").rstrip("/")
-                    source_path_str = normalized_source_path_for_copy.replace("\\", "/")
-                    if source_path_str.lower().startswith(matched_root_str.lower() + "/"):
-                        final_relative_part = source_path_str[len(matched_root_str) + 1:] # Get the part after the root + '/'
-                        _log_print("debug", f"  Derived ASSET relative part '{final_relative_part}' from source '{normalized_source_path_for_copy}' relative to matched root '{matched_root_str}'.")
-                    else:
-                        _log_print("warning", f"  ASSET '{normalized_source_path_for_copy}' did not start with its matched_library_root '{matched_root_str}' as expected. Falling back to item name.")
-                        final_relative_part = source_path_obj.name # Fallback
-                else: # Original logic for non-ASSETS_REL or if matched_library_root is missing
-                    for i, part in enumerate(path_parts):
-                        if part == shot_code:
-                            shot_code_idx = i
-                            break
-                    
+            # For ASSETS_REL, we need to use the matched library root to determine the relative part.
+            if dependency_category == ASSETS_REL and data["matched_library_root"]:
+                matched_root_str = str(data["matched_library_root"]).replace("\\", "/").rstrip("/")
+                if normalized_source_path_for_copy.lower().startswith(matched_root_str.lower() + "/"):
+                    final_relative_part = normalized_source_path_for_copy[len(matched_root_str) + 1:] # Get the part after the root + '/'
+                    _log("debug", "  Derived ASSET relative part '%s' from source '%s' relative to matched root '%s'.", final_relative_part, normalized_source_path_for_copy, matched_root_str)
+                else:
+                    _log("warning", f"  ASSET '{normalized_source_path_for_copy}' did not start with its matched_library_root '{matched_root_str}' as expected. Falling back to item name.")
+                    final_relative_part = source_item_name # Fallback
+            else: # Original logic for non-ASSETS_REL or if matched_library_root is missing
+                # Find the first path component equal to the shot code with C-level string searches
+                # (leading component, then interior, then trailing) without allocating a copy of the path.
+                shot_code_end_idx = -1
+                if normalized_source_path_for_copy.startswith(shot_code_prefix):
+                    shot_code_end_idx = len(shot_code_prefix)
+                else:
+                    shot_code_idx = normalized_source_path_for_copy.find(shot_code_component)
                     if shot_code_idx != -1:
-                        shot_code_found_in_path = True
-                        final_relative_part = "/".join(path_parts[shot_code_idx + 1:])
-                        _log_print("debug", f"  Derived relative part '{final_relative_part}' from source '{normalized_source_path_for_copy}' after shot code '{shot_code}'.")
-                    else:
-                        final_relative_part = source_path_obj.name
-                        _log_print("debug", f"  Shot code '{shot_code}' not found in source path '{normalized_source_path_for_copy}'. Using item name '{final_relative_part}' as relative part under category '{dependency_category}'.")
-
-            except ValueError: # This was for the shot_code splitting, might be less relevant if ASSETS_REL uses direct relative pathing.
-                 _log_print("warning", f"  Could not split path based on shot code for: {normalized_source_path_for_copy}. Falling back to item name.")
-                 final_relative_part = source_path_obj.name
+                        shot_code_end_idx = shot_code_idx + len(shot_code_component)
+                    elif normalized_source_path_for_copy == shot_code or normalized_source_path_for_copy.endswith(shot_code_suffix):
+                        shot_code_end_idx = len(normalized_source_path_for_copy)
+                
+                if shot_code_end_idx != -1:
+                    shot_code_found_in_path = True
+                    final_relative_part = normalized_source_path_for_copy[shot_code_end_idx:]
+                    _log("debug", "  Derived relative part '%s' from source '%s' after shot code '%s'.", final_relative_part, normalized_source_path_for_copy, shot_code)
+                else:
+                    final_relative_part = source_item_name
+                    _log("debug", "  Shot code '%s' not found in source path '%s'. Using item name '%s' as relative part under category '%s'.", shot_code, normalized_source_path_for_copy, final_relative_part, dependency_category)
             
             if not final_relative_part and is_directory_to_copy:
-                 if source_path_obj.name:
-                     final_relative_part = source_path_obj.name
-                     _log_print("debug", f"  Relative part was empty for directory \'{normalized_source_path_for_copy}\', using its name \'{final_relative_part}\'.")
+                 if source_item_name:
+                     final_relative_part = source_item_name
+                     _log("debug", "  Relative part was empty for directory '%s', using its name '%s'.", normalized_source_path_for_copy, final_relative_part)
 
             if dependency_category == ELEMENTS_REL and shot_code_found_in_path:
-                comp_match = comp_work_images_re.match(final_relative_part)
+                # Cheap anchored prefix test first; the regex only runs on paths that can match
+                comp_match = None
+                if final_relative_part[:len(COMP_WORK_IMAGES_PREFIX)].lower() == COMP_WORK_IMAGES_PREFIX:
+                    comp_match = COMP_WORK_IMAGES_RE.match(final_relative_part)
                 if comp_match:
-                    _log_print("debug", f"  Applying Comp/work/images rule to (elements): \'{final_relative_part}\'")
+                    _log("debug", "  Applying Comp/work/images rule to (elements): '%s'", final_relative_part)
                     final_relative_part = comp_match.group(1)
-                    _log_print("debug", f"  Resulting relative path after Comp/work rule (elements): \'{final_relative_part}\'")
+                    _log("debug", "  Resulting relative path after Comp/work rule (elements): '%s'", final_relative_part)
             
             elif dependency_category == PUBLISH_REL:
                 publish_prefix = "publish/"
@@ -1061,35 +1268,86 @@ def generate_dependency_map(dependency_info: Dict[str, Dict[str, Any]], archive_
                     actual_publish_prefix_idx = final_relative_part.lower().find(publish_prefix)
                     if actual_publish_prefix_idx != -1:
                         final_relative_part = final_relative_part[actual_publish_prefix_idx + len(publish_prefix):]
-                        _log_print("debug", f"  Stripped leading \'{publish_prefix}\' (case-insensitive) from publish path. New final_relative_part: \'{final_relative_part}\'")
+                        _log("debug", "  Stripped leading '%s' (case-insensitive) from publish path. New final_relative_part: '%s'", publish_prefix, final_relative_part)
 
-            final_relative_part = final_relative_part.lstrip('/')
+            final_relative_part = final_relative_part.strip('/') # Joined below by plain concatenation
 
-            dest_path = category_spt_path / final_relative_part
-            dest_path_str = str(dest_path).replace("\\", "/")
+            dest_path_str = f"{category_spt_path_str}/{final_relative_part}" if final_relative_part else category_spt_path_str
 
-            dependencies_to_copy[normalized_source_path_for_copy] = {
+            dependencies_to_copy[source_path_for_copy] = {
                 "destination_path": dest_path_str,
                 "is_directory": is_directory_to_copy,
                 "exists_on_disk": exists_on_disk
             }
-            _log_print("debug", f"  Mapped dependency (Cat: {dependency_category}): \'{normalized_source_path_for_copy}\' -> Dest: \'{dest_path_str}\', IsDir: {is_directory_to_copy}, Exists: {exists_on_disk}")
+            _log("debug", "  Mapped dependency (Cat: %s): '%s' -> Dest: '%s', IsDir: %s, Exists: %s", dependency_category, normalized_source_path_for_copy, dest_path_str, is_directory_to_copy, exists_on_disk)
 
         except Exception as map_e:
-            _log_print("error", f"Could not calculate destination for copying \'{normalized_source_path_for_copy}\': {map_e} (from item key: {node_knob_identifier})")
-            _log_print("debug", f"Exception details: {traceback.format_exc()}")
+            _log("error", f"Could not calculate destination for copying \'{normalized_source_path_for_copy}\': {map_e} (from item key: {node_knob_identifier})")
+            if _DEBUG_ENABLED:
+                _log("debug", "Exception details: %s", traceback.format_exc())
 
     _log_print("info", f"Collected mapping for {len(dependencies_to_copy)} unique file system items.")
     if dependencies_to_copy:
-        try:
-            _log_print("debug", f"Full dependencies_to_copy map: {json.dumps(dependencies_to_copy, indent=2)}")
-        except TypeError:
-            _log_print("warning", "Could not serialize dependencies_to_copy to JSON for full logging.")
+        if _DEBUG_ENABLED: # Serializing the full map is expensive; only do it when it will be shown
+            try:
+                _log_print("debug", "Full dependencies_to_copy map: %s", json.dumps(dependencies_to_copy, indent=2))
+            except TypeError:
+                _log_print("warning", "Could not serialize dependencies_to_copy to JSON for full logging.")
     else:
         _log_print("info", "dependencies_to_copy map is empty.")
 
     return dependencies_to_copy
 
+@functools.lru_cache(maxsize=1024)
+def _build_spt_path(
+    archive_root_str: str,
+    vendor: str,
+    show: str,
+    episode: str,
+    sequence: str,
+    shot_num: str,
+    tag: str,
+    relative_category_path_str: str
+) -> Path:
+    """
+    Builds the SPT path for already-extracted metadata strings (see _get_spt_path).
+    Memoized on its hashable string arguments, so after the first call for a given
+    archive root, shot and category every later call is a dict lookup.
+    Show/episode/sequence/shot/tag are ignored (pass empty strings) for ASSETS_REL.
+    """
+    # Paths are assembled as one forward-slash string and wrapped in Path once at the end
+    archive_root_norm = archive_root_str.replace("\\", "/").rstrip("/")
+
+    # --- Format directory components using locally defined constants ---
+    vendor_fmt = VENDOR_DIR.format(vendor=vendor)
+
+    # Handle ASSETS_REL category separately for a vendor-level path
+    if relative_category_path_str == ASSETS_REL:
+        final_category_path = Path(f"{archive_root_norm}/{vendor_fmt}/{ASSETS_REL}")
+        _log_print("debug", "Constructed SPT ASSETS category path: %s", final_category_path)
+        return final_category_path
+
+    show_fmt = SHOW_DIR.format(show=show)
+    episode_fmt = EPISODE_DIR.format(episode=episode)
+    # Use the SHOT_DIR constant for the shot-level directory name
+    shot_dir_fmt = SHOT_DIR.format(episode=episode, sequence=sequence, shot=shot_num, tag=tag)
+
+    # --- Construct Path ---
+    # Path: archive_root / vendor / show / episode / formatted_shot_dir / category
+    final_category_path_str = f"{archive_root_norm}/{vendor_fmt}/{show_fmt}/{episode_fmt}/{shot_dir_fmt}"
+    
+    if relative_category_path_str:
+        # Normalize slashes for the relative category path and remove leading/trailing
+        clean_relative_path = relative_category_path_str.replace("\\", "/").strip('/')
+        if '..' in clean_relative_path.split('/'):
+             _log_print("warning", f"Relative category path '{relative_category_path_str}' for SPT construction contains '..'. This might be unsafe.")
+        if clean_relative_path:
+            final_category_path_str = f"{final_category_path_str}/{clean_relative_path}"
+    
+    final_category_path = Path(final_category_path_str)
+    _log_print("debug", "Constructed SPT category path in Nuke Executor: %s", final_category_path)
+    return final_category_path
+
 def _get_spt_path(
     archive_root_str: str,
     metadata_dict: Dict[str, Any],
@@ -1105,43 +1363,20 @@ def _get_spt_path(
     try:
         # --- Extract metadata (caller should ensure keys exist) ---
         vendor = str(metadata_dict['vendor'])
-
-        # --- Format directory components using locally defined constants ---
-        vendor_fmt = VENDOR_DIR.format(vendor=vendor)
-
-        # Handle ASSETS_REL category separately for a vendor-level path
         if relative_category_path_str == ASSETS_REL:
-            final_category_path = Path(archive_root_str) / vendor_fmt / ASSETS_REL
-            _log_print("debug", f"Constructed SPT ASSETS category path: {final_category_path}")
-            return final_category_path
-
-        # --- Continue with existing logic for project/shot specific paths ---
-        show = str(metadata_dict['show'])
-        episode = str(metadata_dict['episode'])
-        sequence = str(metadata_dict['sequence'])
-        shot_num = str(metadata_dict['shot'])
-        tag = str(metadata_dict['tag'])
-
-        # --- Format directory components using locally defined constants ---
-        show_fmt = SHOW_DIR.format(show=show)
-        episode_fmt = EPISODE_DIR.format(episode=episode)
-        # Use the SHOT_DIR constant for the shot-level directory name
-        shot_dir_fmt = SHOT_DIR.format(episode=episode, sequence=sequence, shot=shot_num, tag=tag)
-
-        # --- Construct Path ---
-        # Path: archive_root / vendor / show / episode / formatted_shot_dir / category
-        base_shot_path = Path(archive_root_str) / vendor_fmt / show_fmt / episode_fmt / shot_dir_fmt
-        
-        final_category_path = base_shot_path
-        if relative_category_path_str:
-            # Normalize slashes for the relative category path and remove leading/trailing
-            clean_relative_path = relative_category_path_str.replace("\\", "/").strip('/')
-            if '..' in clean_relative_path.split('/'):
-                 _log_print("warning", f"Relative category path '{relative_category_path_str}' for SPT construction contains '..'. This might be unsafe.")
-            final_category_path = base_shot_path / clean_relative_path
-        
-        _log_print("debug", f"Constructed SPT category path in Nuke Executor: {final_category_path}")
-        return final_category_path
+            # Vendor-level path; shot metadata is not needed (or required) here
+            return _build_spt_path(archive_root_str, vendor, "", "", "", "", "", relative_category_path_str)
+
+        return _build_spt_path(
+            archive_root_str,
+            vendor,
+            str(metadata_dict['show']),
+            str(metadata_dict['episode']),
+            str(metadata_dict['sequence']),
+            str(metadata_dict['shot']),
+            str(metadata_dict['tag']),
+            relative_category_path_str or ""
+        )
 
     except KeyError as e:
         _log_print("error", f"Missing metadata key for SPT path construction in Nuke Executor: {e}. Metadata: {metadata_dict}")
@@ -1158,7 +1393,7 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
     errors = []
     _log_print("info", "--- Starting Nuke Task Execution ---") # Start Task Log
     # Log relevant environment variables
-    _log_print("debug", f"NUKE_PATH env: {os.environ.get('NUKE_PATH', 'Not Set')}")
+    _log_print("debug", "NUKE_PATH env: %s", os.environ.get('NUKE_PATH', 'Not Set'))
 
     # Parse metadata_json once here
     metadata_dict: Optional[Dict[str, Any]] = None
@@ -1184,6 +1419,17 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
         # Assume success unless an operation sets it to failure and adds to errors list
         results["status"] = "success"
 
+        # 0. Prepare output directories up front so a bad archive location fails before any pruning work.
+        # _ensure_dir caches these, so the later calls in save_pruned_script are free.
+        _log_print("info", "Step 0: Preparing Output Directories...")
+        for dir_to_ensure in (args.archive_root, os.path.dirname(args.final_script_archive_path)):
+            if not dir_to_ensure: continue
+            try:
+                _ensure_dir(dir_to_ensure)
+            except OSError as dir_e:
+                raise ConfigurationError(f"Could not create output directory '{dir_to_ensure}': {dir_e}")
+        _log_print("info", "Step 0: Prepare Output Directories COMPLETED.")
+
         # 1. Load Input Script
         _log_print("info", "Step 1: Loading Input Script...")
         load_input_script(args.input_script_path)
@@ -1216,17 +1462,18 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
         # Identify all relevant Write and WriteFix nodes for output path collection
         all_target_output_nodes_set: Set[nuke.Node] = set()
         root_nodes = nuke.allNodes(group=nuke.root()) # Get only nodes at the root level initially
-        _log_print("debug", f"Scanning {len(root_nodes)} root level nodes for explicit output path collection.")
+        _log_print("debug", "Scanning %d root level nodes for explicit output path collection.", len(root_nodes))
 
         for node in root_nodes: # Iterate over root nodes
             # Check if it's a Write node type OR a valid WriteFix gizmo
-            if node.Class() in WRITE_NODE_CLASSES or _is_valid_writefix(node):
+            if _is_write_output(node):
                 disable_knob = node.knob('disable')
                 if disable_knob and disable_knob.value():
-                    _log_print("debug", f"Skipping disabled output node for explicit path collection: {node.fullName()}")
+                    _log_print("debug", "Skipping disabled output node for explicit path collection: %s", _full_name(node))
                     continue
                 all_target_output_nodes_set.add(node)
-                _log_print("debug", f"Added node '{node.fullName()}' (Class: {node.Class()}) to explicit output collection set.")
+                if _DEBUG_ENABLED:
+                    _log_print("debug", "Added node '%s' (Class: %s) to explicit output collection set.", _full_name(node), _node_class(node))
         
         _log_print("info", f"Found {len(all_target_output_nodes_set)} active root Write/WriteFix nodes for explicit output path collection.")
 
@@ -1236,7 +1483,9 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
         nodes_for_path_collection = required_nodes.union(all_target_output_nodes_set)
         _log_print("info", f"Total unique nodes for path collection (required_nodes + explicit_outputs): {len(nodes_for_path_collection)}")
         
-        dependency_info = _collect_dependency_paths(nodes_for_path_collection, metadata_dict, LIBRARY_ROOTS)
+        # Knob objects, values and evaluations recorded during collection are reused by repathing (step 9)
+        knob_resolutions: Dict[str, Tuple[nuke.Node, nuke.Knob, Any, Any, Optional[str]]] = {}
+        dependency_info = _collect_dependency_paths(nodes_for_path_collection, metadata_dict, LIBRARY_ROOTS, knob_resolutions)
         results["original_dependencies"] = dependency_info # This now contains inputs and outputs with categories
         _log_print("info", f"Step 6: Collect Dependency Paths COMPLETED. Found {len(dependency_info)} potential paths from combined set.")
         
@@ -1249,19 +1498,14 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
         # 8. Generate the dependency map (for copying and potentially repathing)
         # This map is {resolved_path_in_nuke: {destination_path, source_item_on_disk, ...}}
         _log_print("info", "Step 8: Generating Full Dependency Map (for copy and repath)... ")
-        # Initialize map_for_copy_and_repath to an empty dictionary to ensure it's always defined
-        map_for_copy_and_repath: Dict[str, Dict[str, Any]] = {}
-        if results["status"] == "success": # Should always be true here if no prior critical errors
-            map_for_copy_and_repath = generate_dependency_map(
-                dependency_info, # Output from _collect_dependency_paths
-                args.archive_root,
-                metadata_dict
-            )
-            results["dependencies_to_copy"] = map_for_copy_and_repath # This is the map for the main process
-            _log_print("info", f"Step 8: Generate Full Dependency Map COMPLETED. Found {len(map_for_copy_and_repath)} items for potential copy/repath.")
-        else:
-            _log_print("warning", "Skipping full dependency map generation due to earlier status not being 'success'.")
-            results["dependencies_to_copy"] = {} # Ensure it exists
+        # Nothing before this point sets a failure status (errors raise), so the map is always built
+        map_for_copy_and_repath: Dict[str, Dict[str, Any]] = generate_dependency_map(
+            dependency_info, # Output from _collect_dependency_paths
+            args.archive_root,
+            metadata_dict
+        )
+        results["dependencies_to_copy"] = map_for_copy_and_repath # This is the map for the main process
+        _log_print("info", f"Step 8: Generate Full Dependency Map COMPLETED. Found {len(map_for_copy_and_repath)} items for potential copy/repath.")
 
 
         # 9. Repath Knobs (Optional) - Operates on required_nodes (potentially after baking)
@@ -1281,7 +1525,8 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
                     repath_count = _repath_nodes(
                         required_nodes, 
                         map_for_copy_and_repath, # Pass the rich map
-                        args.final_script_archive_path
+                        args.final_script_archive_path,
+                        knob_resolutions
                     )
                     _log_print("info", f"--- Finished Repath Script Knobs ({repath_count} paths updated) --- ")                    
             else:
@@ -1295,7 +1540,7 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
         _log_print("info", "Step 10: Saving Pruned Script...")
         final_saved_script_path = ""
         if results["status"] == "success": # Only save if no critical errors before this point
-            final_saved_script_path = save_pruned_script(required_nodes, args.final_script_archive_path, args.archive_root)
+            final_saved_script_path = save_pruned_script(required_nodes, args.final_script_archive_path)
             results["final_saved_script_path"] = final_saved_script_path
             _log_print("info", "Step 10: Save Pruned Script COMPLETED.")
         else:
@@ -1311,29 +1556,29 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
 
     except PruningError as pe:
         results["status"] = "failure"
-        error_msg = f"Pruning Error: {pe}\n{traceback.format_exc()}"
+        error_msg = f"Pruning Error: {pe}"
         errors.append(error_msg)
         _log_print("error", f"--- Nuke Task Execution FAILED (PruningError) ---")
-        _log_print("error", error_msg)
+        _log_print("error", "%s\n%s", error_msg, traceback.format_exc())
     except ConfigurationError as ce:
         results["status"] = "failure"
-        error_msg = f"Configuration Error: {ce}\n{traceback.format_exc()}"
+        error_msg = f"Configuration Error: {ce}"
         errors.append(error_msg)
         _log_print("error", f"--- Nuke Task Execution FAILED (ConfigurationError) ---")
-        _log_print("error", error_msg)
+        _log_print("error", "%s\n%s", error_msg, traceback.format_exc())
     except ArchiverError as ae:
         results["status"] = "failure"
-        error_msg = f"Archiver Error: {ae}\n{traceback.format_exc()}"
+        error_msg = f"Archiver Error: {ae}"
         errors.append(error_msg)
         _log_print("error", f"--- Nuke Task Execution FAILED (ArchiverError) ---")
-        _log_print("error", error_msg)
+        _log_print("error", "%s\n%s", error_msg, traceback.format_exc())
     except Exception as e:
         # Catch all other errors during the process
         results["status"] = "failure"
-        error_msg = f"Error during Nuke processing: {e}\n{traceback.format_exc()}"
+        error_msg = f"Error during Nuke processing: {e}"
         errors.append(error_msg)
         _log_print("error", f"--- Nuke Task Execution FAILED --- ") # Failure Log
-        _log_print("error", error_msg)
+        _log_print("error", "%s\n%s", error_msg, traceback.format_exc())
     
     # Ensure that if the status is failure, the errors list is not empty
     if results.get("status") == "failure" and not errors: # `errors` is the local list from this function
@@ -1346,6 +1591,37 @@ def run_nuke_tasks(args: argparse.Namespace) -> Dict[str, Any]:
     return results
 
 
+def _dumps_results(data: Dict[str, Any]) -> str:
+    """
+    Serializes executor results for stdout. Pretty-printed for interactive terminals only;
+    the parent process reads a pipe, where compact separators cut output size considerably.
+    """
+    if sys.stdout.isatty():
+        return json.dumps(data, indent=4)
+    return json.dumps(data, separators=(',', ':'))
+
+
+_results_emitted = False # Set once a results payload has been written; stdout must carry only one
+
+def _write_results(json_output: str) -> None:
+    """
+    Writes the serialized results to stdout as one encoded block. json.dumps escapes
+    non-ASCII, so the text is ASCII; writing bytes straight to the binary buffer skips
+    the text layer's re-encoding and chunking. Falls back to print() if stdout has no buffer.
+    """
+    global _results_emitted
+    data = json_output.encode("ascii") + b"\n"
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        print(json_output, file=sys.stdout)
+    else:
+        sys.stdout.flush() # Text written earlier (the start tag) must precede the payload
+        buffer.write(data)
+        buffer.flush()
+    sys.stdout.flush()
+    _results_emitted = True
+
+
 # --- Main Execution Block ---
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Internal Nuke Executor for Fix Archive")
@@ -1369,8 +1645,8 @@ if __name__ == "__main__":
 
     except Exception as e:
         _log_print("error", f"--- NUKE EXECUTOR FATAL ERROR (before or during run_nuke_tasks) ---")
-        err_msg = f"A top-level error occurred in Nuke execution: {e}\n{traceback.format_exc()}"
-        _log_print("error", err_msg)
+        err_msg = f"A top-level error occurred in Nuke execution: {e}"
+        _log_print("error", "%s\n%s", err_msg, traceback.format_exc())
         # Ensure errors list exists and append
         if not isinstance(final_results.get("errors"), list):
             final_results["errors"] = []
@@ -1385,55 +1661,54 @@ if __name__ == "__main__":
         except Exception as e_print_tag:
             _log_print("error", f"CRITICAL: Failed to print json_start_tag to stdout: {e_print_tag}")
             try:
-                print(json.dumps({"status": "failure", "errors": ["Failed to print JSON start tag", str(e_print_tag)]}, indent=4), file=sys.stdout)
-                sys.stdout.flush()
+                _write_results(_dumps_results({"status": "failure", "errors": ["Failed to print JSON start tag", str(e_print_tag)]}))
             except: pass
 
-        data_to_serialize = {}
-        if final_results.get("status") == "failure":
-            data_to_serialize["status"] = "failure"
-            collected_errors = final_results.get("errors", [])
-            if not isinstance(collected_errors, list):
-                collected_errors = [str(collected_errors)] # Ensure it's a list
+        # A payload already written (start-tag fallback) must not be followed by a second one,
+        # and the possibly large results need not be serialized at all in that case.
+        if not _results_emitted:
+            data_to_serialize = {}
+            if final_results.get("status") == "failure":
+                data_to_serialize["status"] = "failure"
+                collected_errors = final_results.get("errors", [])
+                if not isinstance(collected_errors, list):
+                    collected_errors = [str(collected_errors)] # Ensure it's a list
             
-            stringified_errors = [str(err) for err in collected_errors if err is not None and str(err).strip()]
+                stringified_errors = [str(err) for err in collected_errors if err is not None and str(err).strip()]
             
-            if not stringified_errors:
-                stringified_errors = ["An unspecified error occurred in the Nuke executor."]
-            data_to_serialize["errors"] = stringified_errors
-        else: # Success
-            data_to_serialize = final_results.copy() # Operate on a copy
-            if "nodes_kept" in data_to_serialize and isinstance(data_to_serialize.get("nodes_kept"), list):
-                data_to_serialize["nodes_kept"] = len(data_to_serialize["nodes_kept"])
-            # Ensure status is success if somehow not set (should be by run_nuke_tasks)
-            data_to_serialize["status"] = final_results.get("status", "success")
+                if not stringified_errors:
+                    stringified_errors = ["An unspecified error occurred in the Nuke executor."]
+                data_to_serialize["errors"] = stringified_errors
+            else: # Success
+                data_to_serialize = final_results.copy() # Operate on a copy
+                if "nodes_kept" in data_to_serialize and isinstance(data_to_serialize.get("nodes_kept"), list):
+                    data_to_serialize["nodes_kept"] = len(data_to_serialize["nodes_kept"])
+                # Ensure status is success if somehow not set (should be by run_nuke_tasks)
+                data_to_serialize["status"] = final_results.get("status", "success")
 
-        try:
-            json_output = json.dumps(data_to_serialize, indent=4)
-            print(json_output, file=sys.stdout)
-            sys.stdout.flush()
-        except TypeError as json_e:
-            _log_print("error", f"CRITICAL: Error serializing final results to JSON: {json_e}")
+            try:
+                _write_results(_dumps_results(data_to_serialize))
+            except TypeError as json_e:
+                _log_print("error", f"CRITICAL: Error serializing final results to JSON: {json_e}")
             
-            # Fallback serialization with a guaranteed simple structure
-            original_errors_from_final_results = final_results.get("errors", [])
-            if not isinstance(original_errors_from_final_results, list):
-                original_errors_from_final_results = [str(original_errors_from_final_results)]
+                # Fallback serialization with a guaranteed simple structure
+                original_errors_from_final_results = final_results.get("errors", [])
+                if not isinstance(original_errors_from_final_results, list):
+                    original_errors_from_final_results = [str(original_errors_from_final_results)]
             
-            cleaned_original_errors = [str(e) for e in original_errors_from_final_results if e is not None and str(e).strip()]
-            if not cleaned_original_errors:
-                 cleaned_original_errors = ["No specific error messages were collected prior to serialization failure."]
-
-            fallback_output = {
-                "status": "failure",
-                "errors": cleaned_original_errors + [f"Additionally, a JSON serialization error occurred: {str(json_e)}"],
-                "serialization_error_details": str(json_e)
-            }
-            try:
-                print(json.dumps(fallback_output, indent=4), file=sys.stdout)
-                sys.stdout.flush()
-            except Exception as final_fallback_e:
-                 _log_print("error", f"CRITICAL: Failed to print even fallback JSON: {final_fallback_e}")
+                cleaned_original_errors = [str(e) for e in original_errors_from_final_results if e is not None and str(e).strip()]
+                if not cleaned_original_errors:
+                     cleaned_original_errors = ["No specific error messages were collected prior to serialization failure."]
+
+                fallback_output = {
+                    "status": "failure",
+                    "errors": cleaned_original_errors + [f"Additionally, a JSON serialization error occurred: {str(json_e)}"],
+                    "serialization_error_details": str(json_e)
+                }
+                try:
+                    _write_results(_dumps_results(fallback_output))
+                except Exception as final_fallback_e:
+                     _log_print("error", f"CRITICAL: Failed to print even fallback JSON: {final_fallback_e}")
 
         _log_print("info", f"--- NUKE EXECUTOR SCRIPT END (Exit Code: {exit_code}) ---")
         sys.exit(exit_code)
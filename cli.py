@@ -266,10 +266,11 @@ def main(args: Optional[List[str]] = None) -> None:
         archive_root = normalize_path(parsed_args.archive_root)
         if not Path(original_script_path).is_file():
              raise ConfigurationError(f"Input script not found or is not a file: {original_script_path}")
-        if not Path(archive_root).exists():
+        archive_root_path = Path(archive_root) # is_dir() first: an existing directory costs one stat
+        if not archive_root_path.is_dir():
+             if archive_root_path.exists():
+                 raise ConfigurationError(f"Archive root path exists but is not a directory: {archive_root}")
              log.warning(f"Archive root directory does not exist: {archive_root}. It will be created.")
-        elif not Path(archive_root).is_dir():
-             raise ConfigurationError(f"Archive root path exists but is not a directory: {archive_root}")
              
         # --- Input Path Format Log ---
         script_filename = Path(original_script_path).name
@@ -0,0 +1,136 @@
+"""
+Tests for _nuke_executor helpers that do not need a running Nuke.
+
+The executor imports 'nuke' at module level, so a minimal stand-in module is
+registered before loading it from its file path.
+"""
+import importlib.util
+import sys
+import types
+import unittest
+from pathlib import Path
+
+
+class _FakeKnob:
+    def __init__(self, value):
+        self._value = value
+
+    def value(self):
+        return self._value
+
+    def evaluate(self):
+        return self._value
+
+    def setValue(self, value):
+        self._value = value
+
+
+class _FakeNode:
+    def __init__(self, name, node_class, knobs):
+        self._name = name
+        self._class = node_class
+        self._knobs = knobs
+
+    def fullName(self):
+        return self._name
+
+    def Class(self):
+        return self._class
+
+    def knob(self, name):
+        return self._knobs.get(name)
+
+
+class _FakeRoot:
+    def name(self):
+        return "/shots/ep01/script.nk"
+
+
+def _load_executor():
+    fake_nuke = types.ModuleType("nuke")
+    fake_nuke.Node = _FakeNode
+    fake_nuke.Knob = _FakeKnob
+    fake_nuke.Text_Knob = type("Text_Knob", (_FakeKnob,), {})
+    fake_nuke.Undo = types.SimpleNamespace(disable=lambda: None, enable=lambda: None)
+    fake_nuke.root = _FakeRoot
+    fake_nuke.addOnScriptLoad = lambda callback: None
+    sys.modules.setdefault("nuke", fake_nuke)
+
+    executor_path = Path(__file__).resolve().parent.parent / "_nuke_executor.py"
+    spec = importlib.util.spec_from_file_location("fixarc_nuke_executor_under_test", executor_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+executor = _load_executor()
+
+
+class RepathNodesTest(unittest.TestCase):
+    def test_replaced_node_is_read_afresh(self):
+        # Collection saw the original Read1; a node with the same name replaced it before repathing
+        old_knob = _FakeKnob("/plates/old.exr")
+        old_node = _FakeNode("Read1", "Read", {"file": old_knob})
+        new_knob = _FakeKnob("/plates/new.exr")
+        new_node = _FakeNode("Read1", "Read", {"file": new_knob})
+        knob_resolutions = {
+            "Read1.file": (old_node, old_knob, "/plates/old.exr", "/plates/old.exr", "/plates/old.exr"),
+        }
+        dependency_map = {
+            "/plates/old.exr": {"destination_path": "/archive/elements/old.exr",
+                                "source_item_on_disk": "/plates/old.exr", "is_source_directory": False},
+            "/plates/new.exr": {"destination_path": "/archive/elements/new.exr",
+                                "source_item_on_disk": "/plates/new.exr", "is_source_directory": False},
+        }
+
+        repathed = executor._repath_nodes(
+            {new_node}, dependency_map, "/archive/nuke/script.nk", knob_resolutions
+        )
+
+        self.assertEqual(repathed, 1)
+        self.assertEqual(new_knob.value(), "../elements/new.exr")
+        self.assertEqual(old_knob.value(), "/plates/old.exr")
+
+
+class DependencyMapTest(unittest.TestCase):
+    METADATA = {"vendor": "FixFX", "show": "show", "episode": "ep01", "sequence": "010", "shot": "0010", "tag": "comp"}
+    ELEMENTS_ROOT = "/archive/FixFX/show/ep01/ep01_010_0010_comp/elements"
+
+    def _map_one(self, source_path, is_directory, category=None, matched_library_root=None):
+        dependency_info = {
+            "Read1.file": {
+                "source_item_on_disk": source_path,
+                "error": None,
+                "dependency_category": category or executor.ELEMENTS_REL,
+                "is_source_directory": is_directory,
+                "exists_on_disk": True,
+                "matched_library_root": matched_library_root,
+            },
+        }
+        dependency_map = executor.generate_dependency_map(dependency_info, "/archive", self.METADATA)
+        self.assertEqual(list(dependency_map), [source_path]) # Keyed by the collected path for repath lookups
+        return dependency_map[source_path]["destination_path"]
+
+    def test_double_slash_in_source_is_collapsed(self):
+        destination = self._map_one("/jobs/ep01_010_0010_comp//plates//bg.0001.exr", False)
+        self.assertEqual(destination, f"{self.ELEMENTS_ROOT}/plates/bg.0001.exr")
+
+    def test_directory_source_with_trailing_slash(self):
+        destination = self._map_one("/jobs/ep01_010_0010_comp/plates/bg/", True)
+        self.assertEqual(destination, f"{self.ELEMENTS_ROOT}/plates/bg")
+
+    def test_directory_source_outside_shot_uses_its_name(self):
+        destination = self._map_one("/library//textures/", True)
+        self.assertEqual(destination, f"{self.ELEMENTS_ROOT}/textures")
+
+    def test_asset_directory_under_library_root(self):
+        destination = self._map_one("/library//textures/wood/", True, executor.ASSETS_REL, "/library/")
+        self.assertEqual(destination, "/archive/FixFX/assets/textures/wood")
+
+    def test_publish_prefix_is_stripped(self):
+        destination = self._map_one("/jobs/ep01_010_0010_comp/publish//renders/v001/", True, executor.PUBLISH_REL)
+        self.assertEqual(destination, "/archive/FixFX/show/ep01/ep01_010_0010_comp/publish/renders/v001")
+
+
+if __name__ == "__main__":
+    unittest.main()
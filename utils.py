@@ -9,7 +9,7 @@ import shutil
 import subprocess
 import time
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any, Union
+from typing import List, Tuple, Optional, Dict, Any, Union, Set
 import sys
 import traceback
 
@@ -25,6 +25,15 @@ from fixarc.exceptions import (
 )
 from fixfx.data.studio_data import StudioData
 
+# --- Optional fast JSON parsing ---
+# orjson parses the executor's (potentially large) results payload several times faster.
+# Its JSONDecodeError subclasses ValueError, so callers handle both parsers the same way.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 # --- Path Manipulation & Validation ---
 def validate_path_exists(path: str, context: str = "Dependency") -> None:
@@ -370,7 +379,7 @@ def _parse_nuke_executor_output(output: str) -> Dict[str, Any]:
         if not json_string:
              raise ValueError("JSON results section is empty after extraction.")
 
-        parsed_json = json.loads(json_string)
+        parsed_json = _json_loads(json_string)
         log.debug("Successfully parsed JSON results from Nuke executor output.")
         return parsed_json
     except ValueError as e: # Catches rindex not found, brace finding errors, or json.JSONDecodeError
@@ -381,7 +390,19 @@ def _parse_nuke_executor_output(output: str) -> Dict[str, Any]:
         raise ParsingError(f"Could not retrieve valid JSON results from Nuke executor: {e}") from e
 
 # --- Robust File Operations ---
-def copy_file_or_sequence(source: str, dest: str, frame_range: Optional[Tuple[int, int]] = None, dry_run: bool = False) -> List[Tuple[str, str]]:
+def _ensure_dir(dir_path: Union[str, Path], ensured_dirs: Optional[Set[str]] = None) -> None:
+    """
+    Creates dir_path (and parents). When ensured_dirs is given, directories already
+    recorded in it skip the mkdir; callers scope that set to a single copy run.
+    """
+    dir_key = str(dir_path)
+    if ensured_dirs is not None and dir_key in ensured_dirs:
+        return
+    Path(dir_key).mkdir(parents=True, exist_ok=True)
+    if ensured_dirs is not None:
+        ensured_dirs.add(dir_key)
+
+def copy_file_or_sequence(source: str, dest: str, frame_range: Optional[Tuple[int, int]] = None, dry_run: bool = False, ensured_dirs: Optional[Set[str]] = None) -> List[Tuple[str, str]]:
     """
     Copy a single file or sequence of frame files using shutil.
     Logs errors but doesn't raise them directly, returns empty list on failure.
@@ -391,6 +412,7 @@ def copy_file_or_sequence(source: str, dest: str, frame_range: Optional[Tuple[in
         dest: Destination file path or sequence pattern
         frame_range: Optional tuple (start, end) for frame range if dealing with sequences
         dry_run: If True, simulate the operation
+        ensured_dirs: Optional set of directories already created in the current copy run
 
     Returns:
         List of (source, dest) pairs that were successfully planned or copied.
@@ -426,7 +448,7 @@ def copy_file_or_sequence(source: str, dest: str, frame_range: Optional[Tuple[in
             dest_dir = Path(norm_dest).parent
             if not dry_run:
                 try:
-                    dest_dir.mkdir(parents=True, exist_ok=True)
+                    _ensure_dir(dest_dir, ensured_dirs)
                 except OSError as e:
                     log.error(f"Failed to create destination directory '{dest_dir}': {e}")
                     return [] # Cannot copy if destination dir fails
@@ -460,7 +482,7 @@ def copy_file_or_sequence(source: str, dest: str, frame_range: Optional[Tuple[in
                 print(".", end="", flush=True) # Progress for single file dry run
             else:
                 try:
-                    dest_dir.mkdir(parents=True, exist_ok=True)
+                    _ensure_dir(dest_dir, ensured_dirs)
                 except OSError as e:
                     log.error(f"Failed to create destination directory '{dest_dir}': {e}")
                     return []
@@ -514,6 +536,7 @@ def copy_files_robustly(
     log.info(f"Starting robust file copy process for {total_expected_entries} dependency item(s)...")
     
     processed_file_sequence_patterns = set() # Track sequence patterns already handled
+    ensured_dirs: Set[str] = set() # Destination directories created during this run only
     dots_printed = False
 
     # Sort items for somewhat predictable processing, helpful for logs
@@ -624,7 +647,7 @@ def copy_files_robustly(
                     items_in_current_operation = 1 
                 else:
                     # Ensure destination parent directory exists
-                    Path(norm_dest).parent.mkdir(parents=True, exist_ok=True)
+                    _ensure_dir(Path(norm_dest).parent, ensured_dirs)
                     # For directory copies with robocopy/rsync, the target dir (norm_dest) itself might need to be made by the tool or explicitly.
                     # Robocopy's /CREATE or rsync creating dest_dir_path handles this.
                     # If is_directory, norm_dest is the directory. Its parent is Path(norm_dest).parent.
@@ -657,8 +680,14 @@ def copy_files_robustly(
                 else:
                     if is_directory:
                         try:
-                            Path(norm_dest).parent.mkdir(parents=True, exist_ok=True)
-                            if Path(norm_dest).exists(): shutil.rmtree(norm_dest) 
+                            _ensure_dir(Path(norm_dest).parent, ensured_dirs)
+                            if Path(norm_dest).exists():
+                                shutil.rmtree(norm_dest)
+                                # Directories at or under norm_dest are gone from disk now
+                                dest_prefix = str(Path(norm_dest)) + os.sep
+                                ensured_dirs.difference_update(
+                                    [d for d in ensured_dirs if d == str(Path(norm_dest)) or d.startswith(dest_prefix)]
+                                )
                             shutil.copytree(norm_source, norm_dest)
                             log.info(f"Shutil successfully copied directory: {norm_source} -> {norm_dest}")
                             copy_success = True
@@ -668,7 +697,7 @@ def copy_files_robustly(
                         except Exception as e:
                             log.error(f"Shutil copytree failed for {norm_source} -> {norm_dest}: {e}")
                     else: # File or File Sequence with shutil
-                        copied_pairs = copy_file_or_sequence(norm_source, norm_dest, frame_range=None, dry_run=dry_run)
+                        copied_pairs = copy_file_or_sequence(norm_source, norm_dest, frame_range=None, dry_run=dry_run, ensured_dirs=ensured_dirs)
                         if copied_pairs:
                             copy_success = True
                             items_in_current_operation = len(copied_pairs)